@@ -0,0 +1,322 @@
+"""Benchmarks for placebo backends.
+
+Every case is run against every backend that can be imported:
+
+    $ python -m benchmarks --output results.json
+    $ python -m benchmarks --backend httmock --case request_static
+    $ python -m benchmarks --compare baseline.json
+
+Results are written as json, so they can be compared between releases.
+Each result has mean, median and min time of one operation in
+microseconds. With --compare, cases that got slower than threshold
+are listed and exit status is 1.
+"""
+import argparse
+import gc
+import importlib
+import json
+import platform
+import re
+import sys
+import timeit
+
+from six.moves.urllib import parse
+
+from placebo import Placebo
+
+URL = 'http://www.example.com/api/items'
+BACKENDS = {
+    'httmock': 'placebo.backends.httmockbackend',
+    'httpretty': 'placebo.backends.httprettybackend',
+    'adapter': 'placebo.backends.adapterbackend',
+    'async': 'placebo.backends.asyncbackend',
+}
+
+
+def load_backend(name):
+    """Returns backend module and a client (get function)
+    or None if backend cannot be imported."""
+    try:
+        backend = importlib.import_module(BACKENDS[name])
+    except (ImportError, SyntaxError):
+        return None
+    if name == 'async':
+        import httpx
+        client = httpx.Client()
+    else:
+        import requests
+        client = requests.Session()
+        # Environment proxy lookup would dominate every request.
+        client.trust_env = False
+    return backend, client.get
+
+
+def regex_url(name):
+    """Regex urls are given in different types for each backend."""
+    if name == 'httpretty':
+        return re.compile(r'^http://www\.example\.com/api/\w+$')
+    return parse.ParseResult(scheme='http', netloc=r'www\.example\.com',
+                             path=r'^/api/\w+$', params='', query='',
+                             fragment='')
+
+
+def make_placebo(backend, **attrs):
+    attrs.setdefault('url', URL)
+    attrs.setdefault('body', '{"id": 1}')
+    attrs['backend'] = backend.get_decorator
+    return type('BenchmarkPlacebo', (Placebo,), attrs)
+
+
+def dynamic_body(self, url, headers, body):
+    return json.dumps({'path': url.path})
+
+
+def measure(operation, number, repeat):
+    """Returns times of one operation in microseconds."""
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = timeit.default_timer()
+            for _ in range(number):
+                operation()
+            times.append((timeit.default_timer() - start) / number * 1e6)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return times
+
+
+##########
+# Cases  #
+##########
+# Every case gets backend name, backend module, client and param. It returns
+# (setup, operation, teardown) where setup and teardown are callables
+# that are run outside of measurement, or None if backend does not
+# support the case.
+
+def case_decoration(name, backend, get, count):
+    """Decorating count test functions with the same placebo class
+    and calling each of them once, like a test case with count
+    test methods."""
+    mock = make_placebo(backend)
+
+    def operation():
+        for _ in range(count):
+            mock.decorate(lambda: None)()
+    return None, operation, None
+
+
+def _active(backend, mocks, operation):
+    """Run operation while all mocks are active. Activation is
+    not measured, only the requests."""
+    activations = [backend.get_activation(mock()) for mock in mocks]
+
+    def setup():
+        for activation in activations:
+            activation.__enter__()
+
+    def teardown():
+        for activation in reversed(activations):
+            activation.__exit__(None, None, None)
+    return setup, operation, teardown
+
+
+def case_request_static(name, backend, get, param):
+    """Requests to a placebo with static body."""
+    mock = make_placebo(backend)
+    return _active(backend, [mock], lambda: get(URL))
+
+
+def case_request_dynamic(name, backend, get, param):
+    """Requests to a placebo with a body callable."""
+    mock = make_placebo(backend, body=dynamic_body)
+    return _active(backend, [mock], lambda: get(URL))
+
+
+def case_stacked(name, backend, get, count):
+    """Requests with count stacked placebo objects of different urls.
+    Outermost one matches."""
+    mocks = [make_placebo(backend, url=URL + '/%d' % i)
+             for i in range(count - 1)]
+    mocks.insert(0, make_placebo(backend))
+    return _active(backend, mocks, lambda: get(URL))
+
+
+def case_regex(name, backend, get, param):
+    """Requests to a placebo with a regex url."""
+    mock = make_placebo(backend, url=regex_url(name))
+    return _active(backend, [mock], lambda: get(URL))
+
+
+def case_templates(name, backend, get, count):
+    """Requests with count active placebo objects that have path
+    templates. Outermost one matches."""
+    mocks = [make_placebo(backend,
+                          url='http://www.example.com/api/%d/{id}' % i)
+             for i in range(count)]
+    return _active(backend, mocks,
+                   lambda: get('http://www.example.com/api/0/items'))
+
+
+def case_regexes(name, backend, get, count):
+    """Same as templates case with regex urls."""
+    if name == 'httpretty':
+        urls = [re.compile(r'^http://www\.example\.com/api/%d/\w+$' % i)
+                for i in range(count)]
+    else:
+        urls = [parse.ParseResult(scheme='http', netloc=r'www\.example\.com',
+                                  path=r'^/api/%d/\w+$' % i, params='',
+                                  query='', fragment='')
+                for i in range(count)]
+    mocks = [make_placebo(backend, url=url) for url in urls]
+    return _active(backend, mocks,
+                   lambda: get('http://www.example.com/api/0/items'))
+
+
+def case_rpc(name, backend, get, count):
+    """Requests with count active placebo objects of the same url that
+    have match_json predicates. Outermost one matches. httpretty does
+    not support predicates."""
+    if name == 'httpretty':
+        return None
+    mocks = [make_placebo(backend, method='POST',
+                          match_json={'method': 'call%d' % i})
+             for i in range(count)]
+    # requests and httpx clients have the same post method.
+    post = get.__self__.post
+    data = {'method': 'call0', 'params': {}}
+    return _active(backend, mocks, lambda: post(URL, json=data))
+
+
+def case_large_body(name, backend, get, size):
+    """Requests to a placebo with a large static body."""
+    mock = make_placebo(backend, body=b'x' * size)
+    return _active(backend, [mock], lambda: get(URL))
+
+
+# name -> (case, params, number of operations per repeat)
+CASES = [
+    ('decoration', case_decoration, [1, 10, 100], 20),
+    ('request_static', case_request_static, [None], 200),
+    ('request_dynamic', case_request_dynamic, [None], 200),
+    ('stacked', case_stacked, [1, 10, 50], 100),
+    ('regex', case_regex, [None], 200),
+    ('templates', case_templates, [1, 100, 500], 100),
+    ('regexes', case_regexes, [1, 100, 500], 100),
+    ('rpc', case_rpc, [1, 10, 100], 100),
+    ('large_body', case_large_body, [1024 * 1024, 16 * 1024 * 1024], 5),
+]
+
+
+def run_case(backend_name, case_name, param, number, repeat=5):
+    """Run a case and return its result or None if backend
+    is not available or does not support the case."""
+    loaded = load_backend(backend_name)
+    if loaded is None:
+        return None
+    backend, get = loaded
+    case = dict((c[0], c[1]) for c in CASES)[case_name]
+    prepared = case(backend_name, backend, get, param)
+    if prepared is None:
+        return None
+    setup, operation, teardown = prepared
+    if setup is not None:
+        setup()
+    try:
+        # Warm up caches (matchers, static responses, connections).
+        operation()
+        times = measure(operation, number, repeat)
+    finally:
+        if teardown is not None:
+            teardown()
+    times.sort()
+    return {'backend': backend_name,
+            'case': case_name,
+            'param': param,
+            'number': number,
+            'repeat': repeat,
+            'mean_us': sum(times) / len(times),
+            'median_us': times[len(times) // 2],
+            'min_us': times[0]}
+
+
+def run(backends, cases, scale=1.0, repeat=5):
+    results = []
+    for backend_name in backends:
+        for case_name, _case, params, number in CASES:
+            if case_name not in cases:
+                continue
+            for param in params:
+                result = run_case(backend_name, case_name, param,
+                                  max(1, int(number * scale)), repeat)
+                if result is None:
+                    break
+                results.append(result)
+                sys.stderr.write('%-10s %-16s %-10s %12.1f us\n' % (
+                    backend_name, case_name,
+                    '' if param is None else param, result['median_us']))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns results that are slower than baseline by threshold."""
+    def key(result):
+        return (result['backend'], result['case'], result['param'])
+    old = dict((key(result), result) for result in baseline['results'])
+    regressions = []
+    for result in results:
+        previous = old.get(key(result))
+        if previous is None:
+            continue
+        ratio = result['median_us'] / previous['median_us']
+        if ratio > threshold:
+            regressions.append(dict(result, ratio=ratio))
+    return regressions
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--backend', action='append',
+                        choices=sorted(BACKENDS),
+                        help='Backends to run (default: all).')
+    parser.add_argument('--case', action='append',
+                        choices=[case[0] for case in CASES],
+                        help='Cases to run (default: all).')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiplier for number of operations.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Write json results to file.')
+    parser.add_argument('--compare',
+                        help='Json results of a previous run.')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Slowdown ratio that is a regression.')
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    results = run(args.backend or sorted(BACKENDS),
+                  args.case or [case[0] for case in CASES],
+                  args.scale, args.repeat)
+    document = {'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                'results': results}
+    output = json.dumps(document, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for result in regressions:
+            sys.stderr.write('Regression: %(backend)s %(case)s %(param)s '
+                             '%(ratio).2fx slower\n' % result)
+        if regressions:
+            return 1
+    return 0
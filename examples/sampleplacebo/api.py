@@ -99,6 +99,23 @@ class DynamicPlacebo(Placebo):
         return status
 
 
+class TemplatePlacebo(Placebo):
+    """Same as DynamicPlacebo with a url template.
+
+    Parameters of url are given to callables as keyword arguments."""
+    url = 'http://www.acme.com/items/{item_id}/'
+    backend = get_decorator
+
+    def body(self, request_url, request_headers, request_body, item_id):
+        if item_id.isdigit():
+            return json.dumps({'id': int(item_id)})
+        return ''
+
+    def status(self, request_url, request_headers, request_body, item_id):
+        """If item_id is not integer return 404."""
+        return 200 if item_id.isdigit() else 404
+
+
 #############
 # UNITTESTS #
 #############
@@ -152,5 +169,20 @@ class DynamicPlaceboTestCase(unittest.TestCase):
             api.get_item('invalid_id')
 
 
+class TemplatePlaceboTestCase(unittest.TestCase):
+
+    @TemplatePlacebo.decorate
+    def test_get_item_valid(self):
+        api = ItemAPIClient()
+        self.assertEqual(api.get_item(1), {'id': 1})
+        self.assertEqual(api.get_item(2), {'id': 2})
+
+    @TemplatePlacebo.decorate
+    def test_get_item_invalid(self):
+        api = ItemAPIClient()
+        with self.assertRaises(ItemException):
+            api.get_item('invalid_id')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,2 +1,10 @@
 # Base mock object
 from placebo.base import Placebo  # noqa
+# Cassette replay
+from placebo.replay import CassettePlacebo  # noqa
+# Process wide configuration
+from placebo.config import configure  # noqa
+# Memory mapped response bodies
+from placebo.response import FileBody  # noqa
+# Responses of respond callables
+from placebo.response import PlaceboResponse  # noqa
@@ -0,0 +1,3 @@
+from placebo.cli import main
+
+main()
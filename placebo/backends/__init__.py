@@ -1,30 +1,68 @@
 import logging
+import os
+
+import six
 
 from placebo.utils.importutils import import_string
 
 logger = logging.getLogger(__name__)
 
+# Environment variable that can be used to choose backend.
+ENVIRONMENT_VARIABLE = 'PLACEBO_BACKEND'
 
 default_backends = [
     'placebo.backends.httmockbackend.get_decorator',
     'placebo.backends.httprettybackend.get_decorator',
 ]
 
+# Backend is resolved only once per process.
+_backend = None
 
-def get_backend():
-    """Returns a backend that has correct dependencies."""
+
+def _resolve_backend():
+    """Find a backend from environment or default backends."""
+    path = os.environ.get(ENVIRONMENT_VARIABLE)
+    if path:
+        # If backend is explicitly given, do not fall back
+        # to default backends.
+        return import_string(path)
 
     # try to import backends one by one.
-    backend = None
     for st in default_backends:
         try:
-            backend = import_string(st)
-            break
+            return import_string(st)
         except ImportError as e:
             logger.warning('Could not import %s: %s', st, e)
 
-    if backend is None:
-        raise ValueError('No backend is supported. (Did you install any of'
-                         'mock dependencies like httmock or httpretty?)')
-    else:
-        return backend
+    raise ValueError('No backend is supported. (Did you install any of'
+                     'mock dependencies like httmock or httpretty?)')
+
+
+def set_backend(backend):
+    """Set process wide backend.
+
+    backend can be a backend callable or dotted path of a backend.
+    If backend is None, backend will be resolved again on next request.
+    """
+    global _backend
+    if isinstance(backend, six.string_types):
+        backend = import_string(backend)
+    elif backend is not None and not six.callable(backend):
+        raise ValueError('Backend must be a callable or dotted path of '
+                         'a callable. Instead type %s provided. (%s)' %
+                         (type(backend), backend))
+    _backend = backend
+
+
+def get_backend():
+    """Returns a backend that has correct dependencies."""
+    global _backend
+    if _backend is None:
+        _backend = _resolve_backend()
+    return _backend
+
+
+def get_backend_name():
+    """Returns dotted path of current backend."""
+    backend = get_backend()
+    return '%s.%s' % (backend.__module__, backend.__name__)
@@ -0,0 +1,145 @@
+"""Backend that serves placebo objects through a requests transport adapter.
+
+Responses are built straight from PlaceboResponse objects. There are no
+fake sockets and no httmock context. All active placebo objects are kept
+in a single route table like httmock backend.
+
+get_decorator installs the dispatcher globally by patching
+requests.adapters.HTTPAdapter.send while a placebo is active.
+get_mounted_decorator does not patch anything. Requests are only mocked
+for sessions that have a PlaceboAdapter mounted:
+
+    session.mount('http://', PlaceboAdapter())
+"""
+from requests import adapters
+from requests import exceptions
+
+from placebo.backends import dispatch
+from placebo.backends.requestsutils import build_response
+from placebo.utils.decoratorutils import activation_decorator
+
+# Original send method, used for requests that are not mocked.
+_http_adapter_send = adapters.HTTPAdapter.send
+
+
+def get_dispatcher():
+    """Returns active dispatcher or None."""
+    return Dispatcher.get_active() or MountedDispatcher.get_active()
+
+
+class Dispatcher(dispatch.Dispatcher):
+    """Patches requests' HTTPAdapter while it is active."""
+
+    def install(self):
+        dispatcher = self
+
+        def send(adapter, request, stream=False, timeout=None, verify=True,
+                 cert=None, proxies=None):
+            kwargs = {'stream': stream, 'timeout': timeout, 'verify': verify,
+                      'cert': cert, 'proxies': proxies}
+            response = dispatcher.handle(adapter, request, kwargs)
+            if response is None:
+                return _http_adapter_send(adapter, request, **kwargs)
+            return response
+
+        adapters.HTTPAdapter.send = send
+
+    def uninstall(self):
+        adapters.HTTPAdapter.send = _http_adapter_send
+
+    def handle(self, adapter, request, kwargs):
+        """Returns a requests.Response for request or None if no match."""
+        route = self.match(request.method, request.url,
+                           request.headers, request.body)
+        if route is None:
+            return None
+        placebo = route.placebo
+        record_path = placebo._get_record_path()
+        if record_path is not None:
+            return self.record(placebo, record_path, adapter, request, kwargs)
+        response = self.respond(route, request.method, request.url,
+                                request.headers, request.body or '')
+        return build_response(response, request,
+                              stream=kwargs.get('stream', False))
+
+    def record(self, placebo, path, adapter, request, kwargs):
+        """Send request to placebo's target and record the exchange."""
+        target_request = request.copy()
+        target_request.url = placebo._get_target_url(request.url)
+        if not isinstance(adapter, adapters.HTTPAdapter):
+            adapter = adapters.HTTPAdapter()
+        response = _http_adapter_send(adapter, target_request, **kwargs)
+        placebo._record_exchange(path,
+                                 request.method,
+                                 request.url,
+                                 request.headers,
+                                 request.body,
+                                 response.status_code,
+                                 response.headers,
+                                 response.content)
+        response.request = request
+        response.url = request.url
+        return response
+
+
+class MountedDispatcher(Dispatcher):
+    """Dispatcher that is only used by mounted PlaceboAdapters."""
+
+    def install(self):
+        pass
+
+    def uninstall(self):
+        pass
+
+
+class PlaceboAdapter(adapters.BaseAdapter):
+    """requests transport adapter that serves active placebo objects.
+
+    Requests that do not match any placebo object are sent with given
+    fallback adapter. If there is no fallback adapter,
+    requests.exceptions.ConnectionError is raised. Placebo objects of
+    mounted activations are matched first, then global ones.
+    """
+
+    def __init__(self, fallback=None):
+        super(PlaceboAdapter, self).__init__()
+        self.fallback = fallback
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        kwargs = {'stream': stream, 'timeout': timeout, 'verify': verify,
+                  'cert': cert, 'proxies': proxies}
+        # Placebo objects of mounted activations win over global ones.
+        for dispatcher in (MountedDispatcher.get_active(),
+                           Dispatcher.get_active()):
+            if dispatcher is not None:
+                response = dispatcher.handle(self.fallback, request, kwargs)
+                if response is not None:
+                    return response
+        if self.fallback is None:
+            raise exceptions.ConnectionError(
+                'No placebo matches %s %s' % (request.method, request.url),
+                request=request)
+        return self.fallback.send(request, **kwargs)
+
+    def close(self):
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+def get_activation(placebo):
+    """Returns a reusable context manager that activates placebo."""
+    return dispatch.Activation(Dispatcher, placebo)
+
+
+def get_decorator(placebo):
+    return activation_decorator(get_activation(placebo))
+
+
+def get_mounted_activation(placebo):
+    """Returns an activation that does not patch requests library."""
+    return dispatch.Activation(MountedDispatcher, placebo)
+
+
+def get_mounted_decorator(placebo):
+    return activation_decorator(get_mounted_activation(placebo))
@@ -0,0 +1,382 @@
+"""Backend for asyncio http clients.
+
+Placebo objects are served to httpx (sync and async clients) and aiohttp
+client sessions without real sockets or threads. All active placebo
+objects are kept in a single route table. While a placebo is active,
+default httpx transports and aiohttp.ClientSession._request are patched
+to look requests up in the route table first. Requests that do not
+match any placebo are sent with the original implementation.
+
+PlaceboTransport can also be given to httpx clients explicitly.
+Record mode is not supported.
+"""
+import json
+import logging
+
+from six.moves.urllib import parse
+
+from placebo import timing as timing_utils
+from placebo.backends import dispatch
+from placebo.utils import asyncutils
+from placebo.utils.decoratorutils import activation_decorator
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import aiohttp
+    import multidict
+    import yarl
+except ImportError:
+    aiohttp = None
+
+if httpx is None and aiohttp is None:
+    raise ImportError('Async backend needs httpx or aiohttp.')
+
+logger = logging.getLogger(__name__)
+
+
+def get_dispatcher():
+    """Returns active dispatcher or None."""
+    return Dispatcher.get_active()
+
+
+###################
+# httpx transport #
+###################
+
+def build_httpx_response(placebo_response, request, is_async,
+                         timing=None, clock=None):
+    if isinstance(placebo_response.body, bytes):
+        content = placebo_response.body
+    elif is_async:
+        content = asyncutils.aiter_body(placebo_response, timing=timing,
+                                        clock=clock)
+    else:
+        content = (bytes(chunk) for chunk in placebo_response.iter_body())
+    return httpx.Response(placebo_response.status,
+                          headers=list(placebo_response.headers),
+                          content=content,
+                          request=request)
+
+
+async def build_async_response(response, request):
+    """Wait for timing of response and build an httpx response."""
+    response, timing = response
+    clock = timing_utils.get_clock()
+    await asyncutils.wait(response, timing, clock)
+    return build_httpx_response(response, request, True, timing, clock)
+
+
+if httpx is not None:
+    class PlaceboTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+        """httpx transport that serves active placebo objects.
+
+        Requests that do not match any placebo object are sent with
+        given transport. If there is no transport, httpx.ConnectError
+        is raised.
+        """
+
+        def __init__(self, transport=None):
+            self.transport = transport
+
+        def _respond(self, request, body):
+            """Returns PlaceboResponse and timing or None."""
+            dispatcher = get_dispatcher()
+            if dispatcher is None:
+                return None
+            url = str(request.url)
+            route = dispatcher.match(request.method, url,
+                                     request.headers, body)
+            if route is None:
+                return None
+            return dispatcher.get_response(route, request.method, url,
+                                           request.headers, body)
+
+        def _no_match(self, request):
+            return httpx.ConnectError('No placebo matches %s %s' %
+                                      (request.method, request.url),
+                                      request=request)
+
+        def handle_request(self, request):
+            response = self._respond(request, request.read())
+            if response is not None:
+                return build_httpx_response(timing_utils.wait(*response),
+                                            request, False)
+            if self.transport is None:
+                raise self._no_match(request)
+            return self.transport.handle_request(request)
+
+        async def handle_async_request(self, request):
+            response = self._respond(request, await request.aread())
+            if response is not None:
+                return await build_async_response(response, request)
+            if self.transport is None:
+                raise self._no_match(request)
+            return await self.transport.handle_async_request(request)
+
+        def close(self):
+            if self.transport is not None:
+                self.transport.close()
+
+        async def aclose(self):
+            if self.transport is not None:
+                await self.transport.aclose()
+
+
+########################
+# aiohttp client hook  #
+########################
+
+class _StreamReader(object):
+    """Minimal aiohttp.StreamReader interface for mocked bodies."""
+
+    def __init__(self, placebo_response, timing=None, clock=None):
+        self._chunks = placebo_response.iter_body()
+        self._buffer = b''
+        self._eof = False
+        # Stream bodies are throttled while they are read.
+        if not (placebo_response.is_stream and timing is not None and
+                timing.bandwidth):
+            timing = None
+        self._timing = timing
+        self._clock = clock
+
+    def _next_chunk(self):
+        if self._buffer:
+            chunk, self._buffer = self._buffer, b''
+            return chunk
+        for chunk in self._chunks:
+            return bytes(chunk)
+        self._eof = True
+        return b''
+
+    def at_eof(self):
+        return self._eof and not self._buffer
+
+    async def _throttle(self, data):
+        if self._timing is not None and data:
+            await self._clock.asleep(
+                self._timing.get_transfer_time(len(data)))
+        return data
+
+    async def read(self, n=-1):
+        if n < 0:
+            return await self._throttle(
+                b''.join(iter(self._next_chunk, b'')))
+        chunk = self._next_chunk()
+        chunk, self._buffer = chunk[:n], chunk[n:]
+        return await self._throttle(chunk)
+
+    async def readany(self):
+        return await self._throttle(self._next_chunk())
+
+    def iter_any(self):
+        return self._iter(None)
+
+    def iter_chunked(self, n):
+        return self._iter(n)
+
+    async def _iter(self, n):
+        while True:
+            if n is None:
+                chunk = await self.readany()
+            else:
+                chunk = await self.read(n)
+            if not chunk:
+                break
+            yield chunk
+
+
+class PlaceboClientResponse(object):
+    """Mocked response for aiohttp client sessions.
+
+    It implements commonly used parts of aiohttp.ClientResponse.
+    """
+
+    def __init__(self, method, url, placebo_response, request_headers,
+                 timing=None, clock=None):
+        self.method = method
+        self.url = url
+        self.real_url = url
+        self.status = placebo_response.status
+        self.reason = None
+        self.headers = multidict.CIMultiDictProxy(
+            multidict.CIMultiDict(placebo_response.headers))
+        self.request_info = aiohttp.RequestInfo(
+            url, method, multidict.CIMultiDictProxy(
+                multidict.CIMultiDict(request_headers)), url)
+        self.history = ()
+        self.content = _StreamReader(placebo_response, timing, clock)
+        self.closed = False
+        self._body = None
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+    @property
+    def content_type(self):
+        return self.headers.get('Content-Type',
+                                'application/octet-stream').split(';')[0]
+
+    def get_encoding(self):
+        content_type = self.headers.get('Content-Type', '')
+        for part in content_type.split(';')[1:]:
+            key, _, value = part.strip().partition('=')
+            if key.lower() == 'charset':
+                return value
+        return 'utf-8'
+
+    async def read(self):
+        if self._body is None:
+            self._body = await self.content.read()
+        return self._body
+
+    async def text(self, encoding=None, errors='strict'):
+        body = await self.read()
+        return body.decode(encoding or self.get_encoding(), errors)
+
+    async def json(self, encoding=None, loads=json.loads,
+                   content_type='application/json'):
+        return loads(await self.text(encoding))
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise aiohttp.ClientResponseError(self.request_info,
+                                              self.history,
+                                              status=self.status,
+                                              message=str(self.reason),
+                                              headers=self.headers)
+
+    def release(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+    async def wait_for_close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def get_aiohttp_request_body(data, json_data):
+    """Returns request body of an aiohttp request as bytes."""
+    if json_data is not None:
+        return json.dumps(json_data).encode('utf-8')
+    if data is None:
+        return b''
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    if isinstance(data, dict):
+        return parse.urlencode(data).encode('utf-8')
+    # Streams and multipart forms are not read.
+    return b''
+
+
+##############
+# Dispatcher #
+##############
+
+class Dispatcher(dispatch.Dispatcher):
+    """Patches httpx transports and aiohttp sessions while it is active."""
+
+    def install(self):
+        self._patches = []
+        if httpx is not None:
+            transport = PlaceboTransport()
+            self._patch_httpx(transport)
+        if aiohttp is not None:
+            self._patch_aiohttp()
+
+    def uninstall(self):
+        for owner, name, original in reversed(self._patches):
+            setattr(owner, name, original)
+        self._patches = []
+
+    def _patch(self, owner, name, value):
+        self._patches.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, value)
+
+    def _patch_httpx(self, transport):
+        handle_request = httpx.HTTPTransport.handle_request
+        handle_async_request = httpx.AsyncHTTPTransport.handle_async_request
+
+        def fake_handle_request(real_transport, request):
+            response = transport._respond(request, request.read())
+            if response is not None:
+                return build_httpx_response(timing_utils.wait(*response),
+                                            request, False)
+            return handle_request(real_transport, request)
+
+        async def fake_handle_async_request(real_transport, request):
+            response = transport._respond(request, await request.aread())
+            if response is not None:
+                return await build_async_response(response, request)
+            return await handle_async_request(real_transport, request)
+
+        self._patch(httpx.HTTPTransport, 'handle_request',
+                    fake_handle_request)
+        self._patch(httpx.AsyncHTTPTransport, 'handle_async_request',
+                    fake_handle_async_request)
+
+    def _patch_aiohttp(self):
+        request = aiohttp.ClientSession._request
+        dispatcher = self
+
+        async def fake_request(session, method, str_or_url, **kwargs):
+            url = yarl.URL(str_or_url)
+            # Relative urls are joined to base_url of session.
+            base_url = getattr(session, '_base_url', None)
+            if base_url and not url.absolute:
+                url = base_url.join(url)
+            params = kwargs.get('params')
+            if params:
+                url = url.extend_query(params)
+            method = method.upper()
+            # Headers of request override default headers of session.
+            headers = multidict.CIMultiDict(session.headers)
+            headers.update(kwargs.get('headers') or {})
+            headers = dict(headers)
+            body = get_aiohttp_request_body(kwargs.get('data'),
+                                            kwargs.get('json'))
+            route = dispatcher.match(method, str(url), headers, body)
+            if route is None:
+                return await request(session, method, str_or_url, **kwargs)
+            response, timing = dispatcher.get_response(route, method,
+                                                       str(url), headers,
+                                                       body)
+            clock = timing_utils.get_clock()
+            await asyncutils.wait(response, timing, clock)
+            return PlaceboClientResponse(method, url, response, headers,
+                                         timing, clock)
+
+        self._patch(aiohttp.ClientSession, '_request', fake_request)
+
+
+class Activation(dispatch.Activation):
+    """Activation that rejects placebo objects in record mode."""
+
+    def __enter__(self):
+        if self.placebo._get_record_path() is not None:
+            raise ValueError('Record mode is not supported by '
+                             'async backend.')
+        return dispatch.Activation.__enter__(self)
+
+
+def get_activation(placebo):
+    """Returns a reusable context manager that activates placebo."""
+    return Activation(Dispatcher, placebo)
+
+
+def get_decorator(placebo):
+    return activation_decorator(get_activation(placebo))
@@ -0,0 +1,241 @@
+"""Shared parts of backends that dispatch requests with a route table.
+
+Those backends do not patch anything for each placebo object. First
+activation creates a dispatcher and installs it. Every other activation
+only adds its placebo to the route table.
+
+Route tables are kept per thread and asyncio task (with contextvars).
+Dispatcher is installed for the whole process, but a request is only
+matched against placebo objects that are activated in its own thread
+or task. Tasks see placebo objects that were active when they were
+created. Threads and tasks that have no activations of their own (like
+threads of a thread pool) are matched against activations of all
+threads and tasks. Their requests are logged to the context that
+activated the matching placebo. Route tables are never changed in
+place, activations replace them, so matching a request does not need
+a lock.
+"""
+import threading
+
+from six.moves.urllib import parse
+
+from placebo import requestlog
+from placebo import routing
+from placebo import stats
+from placebo import timing
+from placebo.utils.contextutils import ContextVar
+from placebo.utils.contextutils import copy_context
+from placebo.utils.contextutils import get_owner
+
+# dispatcher class -> RouteTable
+_route_tables = ContextVar('placebo_route_tables', default=None)
+_empty_routes = routing.RouteTable()
+# dispatcher class -> RouteTable of activations in all threads and tasks.
+_shared_routes = {}
+# Guards installing and uninstalling dispatchers.
+_lock = threading.Lock()
+
+
+def get_routes(dispatcher_class):
+    """Returns route table of current thread or task."""
+    tables = _route_tables.get()
+    if tables is not None:
+        routes = tables.get(dispatcher_class)
+        if routes is not None:
+            return routes
+    return _empty_routes
+
+
+def get_match_routes(dispatcher_class):
+    """Returns route table that requests of current thread or task are
+    matched with. If current thread or task has no active placebo,
+    activations of all threads and tasks are used."""
+    routes = get_routes(dispatcher_class)
+    if routes is _empty_routes:
+        return _shared_routes.get(dispatcher_class, _empty_routes)
+    return routes
+
+
+def set_routes(dispatcher_class, routes):
+    """Replace route table of current thread or task."""
+    tables = dict(_route_tables.get() or {})
+    if routes:
+        tables[dispatcher_class] = routes
+    else:
+        tables.pop(dispatcher_class, None)
+    _route_tables.set(tables)
+
+
+class Dispatcher(object):
+    """Base class for route table dispatchers.
+
+    Subclasses implement install and uninstall methods to hook
+    into a http library.
+    """
+    # Currently installed dispatcher. It is kept per subclass.
+    active = None
+    # Number of activations in all threads and tasks.
+    activations = 0
+
+    @property
+    def routes(self):
+        return get_match_routes(self.__class__)
+
+    @classmethod
+    def get_active(cls):
+        return cls.__dict__.get('active')
+
+    @classmethod
+    def set_active(cls, dispatcher):
+        cls.active = dispatcher
+
+    @classmethod
+    def acquire(cls):
+        """Install a dispatcher if there is none."""
+        with _lock:
+            if cls.__dict__.get('activations', 0) == 0:
+                dispatcher = cls()
+                cls.set_active(dispatcher)
+                dispatcher.install()
+            cls.activations = cls.__dict__.get('activations', 0) + 1
+
+    @classmethod
+    def release(cls):
+        """Uninstall dispatcher if it is not used anymore."""
+        with _lock:
+            cls.activations -= 1
+            if cls.activations == 0:
+                dispatcher = cls.get_active()
+                cls.set_active(None)
+                dispatcher.uninstall()
+
+    def install(self):
+        raise NotImplementedError()
+
+    def uninstall(self):
+        raise NotImplementedError()
+
+    def match(self, method, url, headers=None, body=None):
+        """Returns matching route for a method and url string or None.
+        Headers and body are only used by placebo objects that have
+        match_headers or match_json."""
+        collector = stats.collector
+        if collector is not None:
+            return collector.match(self.routes, method, parse.urlsplit(url),
+                                   headers, body)
+        return self.routes.match(method, parse.urlsplit(url), headers, body)
+
+    def get_response(self, route, method, url, headers, body):
+        """Returns PlaceboResponse of route for given request and its
+        simulated timing (or None)."""
+        if route.context is not None:
+            # Route of another thread or task. Log the request to
+            # context that activated it. A context can only be entered
+            # by one thread at a time.
+            return route.context.copy().run(self._get_response, route,
+                                            method, url, headers, body)
+        return self._get_response(route, method, url, headers, body)
+
+    def _get_response(self, route, method, url, headers, body):
+        placebo = route.placebo
+        url = parse.urlparse(url)
+        response = placebo._get_response(url, headers, body, method=method,
+                                         responses=route.responses)
+        collector = stats.collector
+        if collector is not None:
+            response = collector.response(placebo, response)
+        return response, placebo._get_timing(url, headers, body)
+
+    def respond(self, route, method, url, headers, body):
+        """Returns PlaceboResponse of route for given request.
+        Waits for simulated latency with clock of current context."""
+        return timing.wait(*self.get_response(route, method, url,
+                                              headers, body))
+
+
+class Activation(object):
+    """Reusable context manager that activates a placebo object.
+
+    Url matcher is compiled when activation is created (and again on
+    every entry if url or method is callable). Entering an activation
+    only adds placebo to route table of current thread or task.
+    Activations can be nested and can be used by multiple threads at
+    the same time.
+    """
+
+    def __init__(self, dispatcher_class, placebo):
+        self.dispatcher_class = dispatcher_class
+        self.placebo = placebo
+        self.matcher = placebo._get_matcher()
+        self.dynamic = placebo._has_dynamic_matcher()
+        placebo._get_static_response()
+        # Route table of contexts that have no other active placebo.
+        # Tables are never changed in place, so it can be shared.
+        self._single = routing.RouteTable()
+        self._single.add(self.matcher, placebo)
+        # thread or task -> routes of its entries in shared route table.
+        self._shared = {}
+
+    def __enter__(self):
+        cls = self.dispatcher_class
+        # Every activation has its own cursor over responses.
+        responses = self.placebo._get_responses()
+        matcher = self.matcher
+        if self.dynamic:
+            matcher = self.placebo._get_matcher()
+        cls.acquire()
+        self.placebo._activate()
+        # Tasks and threads started inside activation
+        # log their requests to this context too.
+        requestlog.get_store()
+        routes = get_routes(cls)
+        if (routes is _empty_routes and responses is None and
+                matcher is self.matcher):
+            routes = self._single
+        else:
+            routes = routes.copy()
+            route = routes.add(matcher, self.placebo)
+            route.responses = responses
+        set_routes(cls, routes)
+        self._share(matcher, responses)
+        return self.placebo
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        cls = self.dispatcher_class
+        routes = get_routes(cls)
+        if routes is self._single:
+            routes = None
+        else:
+            routes = routes.copy()
+            routes.remove(routes.find(self.placebo))
+        set_routes(cls, routes)
+        self._unshare()
+        self.placebo._deactivate()
+        cls.release()
+
+    def _share(self, matcher, responses):
+        """Add placebo to route table of all threads and tasks."""
+        cls = self.dispatcher_class
+        with _lock:
+            shared = _shared_routes.get(cls, _empty_routes).copy()
+            route = shared.add(matcher, self.placebo)
+            route.responses = responses
+            if copy_context is not None:
+                route.context = copy_context()
+            _shared_routes[cls] = shared
+            self._shared.setdefault(get_owner(), []).append(route)
+
+    def _unshare(self):
+        cls = self.dispatcher_class
+        owner = get_owner()
+        with _lock:
+            routes = self._shared[owner]
+            route = routes.pop()
+            if not routes:
+                del self._shared[owner]
+            shared = _shared_routes[cls].copy()
+            shared.remove(route)
+            if shared:
+                _shared_routes[cls] = shared
+            else:
+                del _shared_routes[cls]
@@ -1,37 +1,80 @@
-from six.moves.urllib import parse
-import six
 import httmock
+import requests
 
+from placebo.backends import dispatch
+from placebo.backends.requestsutils import build_response
+from placebo.utils.decoratorutils import activation_decorator
 
-def get_decorator(placebo):
-    url = placebo._get_url()
-
-    if isinstance(url, six.string_types):
-        url = parse.urlparse(url)
-
-    # TODO should we remove empty parts of url?
-    match_kwargs = {
-        'scheme': url.scheme,
-        'netloc': url.netloc,
-        'path': url.path,
-        'method': placebo._get_method(),
-        'query': url.query
-    }
-
-    match_kwargs = {k: v
-                    for k, v in match_kwargs.items()
-                    if v}
-
-    @httmock.urlmatch(**match_kwargs)
-    def mock_response(url, request):
-        # Convert parse result type from SplitResult to ParseResult
-        url = parse.urlparse(url.geturl())
+
+class Dispatcher(httmock.HTTMock, dispatch.Dispatcher):
+    """Single httmock context for all active placebo objects.
+
+    Instead of creating a HTTMock context for every placebo decorator,
+    outermost decorator creates a dispatcher and all the decorators
+    inside it register their placebo objects to dispatcher's route table.
+    """
+
+    def __init__(self):
+        httmock.HTTMock.__init__(self)
+        dispatch.Dispatcher.__init__(self)
+
+    def install(self):
+        self.__enter__()
+
+    def uninstall(self):
+        self.__exit__(None, None, None)
+
+    def intercept(self, request, **kwargs):
+        route = self.match(request.method, request.url,
+                           request.headers, request.body)
+        if route is None:
+            # returning None lets httmock send the real request.
+            return None
+        placebo = route.placebo
+        record_path = placebo._get_record_path()
+        if record_path is not None:
+            return self.record(placebo, record_path, request, kwargs)
         # if body is empty httmock returns None
         # but we want ot to be always string.
         body = request.body or ''
-        headers = request.headers
-        return {'status_code': placebo._get_status(url, headers, body),
-                'content': placebo._get_body(url, headers, body),
-                'headers': placebo._get_headers(url, headers, body)}
+        response = self.respond(route, request.method, request.url,
+                                request.headers, body)
+        return build_response(response, request,
+                              stream=kwargs.get('stream', False))
 
-    return httmock.with_httmock(mock_response)
+    def record(self, placebo, path, request, kwargs):
+        """Send request to placebo's target and record the exchange."""
+        target_request = request.copy()
+        target_request.url = placebo._get_target_url(request.url)
+        # Requests library is patched while dispatcher is active,
+        # so original send method is used to do the real request.
+        kwargs.pop('allow_redirects', None)
+        response = self._real_session_send(requests.Session(),
+                                           target_request,
+                                           allow_redirects=False,
+                                           **kwargs)
+        placebo._record_exchange(path,
+                                 request.method,
+                                 request.url,
+                                 request.headers,
+                                 request.body,
+                                 response.status_code,
+                                 response.headers,
+                                 response.content)
+        response.request = request
+        response.url = request.url
+        return response
+
+
+def get_dispatcher():
+    """Returns active dispatcher or None."""
+    return Dispatcher.get_active()
+
+
+def get_activation(placebo):
+    """Returns a reusable context manager that activates placebo."""
+    return dispatch.Activation(Dispatcher, placebo)
+
+
+def get_decorator(placebo):
+    return activation_decorator(get_activation(placebo))
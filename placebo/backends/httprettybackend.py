@@ -3,49 +3,163 @@ from six.moves.urllib import parse
 
 import httpretty
 
+from placebo import requestlog
+from placebo import stats
+from placebo import timing
+from placebo.utils.contextutils import copy_context
+from placebo.utils.decoratorutils import activation_decorator
+
 logger = logging.getLogger(__name__)
 
+# True while httpretty is enabled by enable function.
+_session = False
+
+
+def enable():
+    """Enable httpretty until disable is called.
+
+    By default, outermost placebo decorator enables httpretty and disables
+    it when it exits. If httpretty is enabled once for a test session or
+    module, decorators only register and unregister their urls.
+    """
+    global _session
+    if not httpretty.is_enabled():
+        httpretty.reset()
+        httpretty.enable()
+    _session = True
+
+
+def disable():
+    """Disable httpretty that is enabled by enable function."""
+    global _session
+    _session = False
+    httpretty.disable()
+    httpretty.reset()
+
+
+def unregister(entry):
+    """Remove a registered httpretty entry."""
+    for matcher, entries in list(httpretty.httpretty._entries.items()):
+        for i, registered in enumerate(entries):
+            if registered is entry:
+                del entries[i]
+                if not entries:
+                    del httpretty.httpretty._entries[matcher]
+                return
+
+
+class Activation(object):
+    """Reusable context manager that registers placebo to httpretty.
+
+    httpretty patches sockets for the whole process, so placebo objects
+    are active in all threads. Responses are created in httpretty's own
+    threads, requests are logged to context that activated placebo.
+    """
+
+    def __init__(self, placebo):
+        self.placebo = placebo
+        # url and method are compiled once per placebo class.
+        self._set_matcher(placebo._get_matcher())
+        self.dynamic = placebo._has_dynamic_matcher()
+        placebo._get_static_response()
+        # Activations can be nested (like recursive calls).
+        self._stack = []
+
+    def _set_matcher(self, matcher):
+        self.method = matcher.method
+        self.url = matcher.get_url_string()
+        # Query parameters are matched in normalized query string.
+        self.match_querystring = matcher.query_params is not None
+        self.has_predicates = matcher.has_predicates
+
+    def get_body(self, request, uri, headers):
+        context = responses = None
+        if self._stack:
+            _is_owner, _entry, context, responses = self._stack[-1]
+        if context is None:
+            return self._get_body(request, uri, responses)
+        # A context can only be entered by one thread at a time.
+        return context.copy().run(self._get_body, request, uri, responses)
+
+    def _get_body(self, request, uri, responses):
+        placebo = self.placebo
+        if placebo._static_response is None and placebo.respond is None:
+            # Callables get headers as dict.
+            request_headers = dict(request.headers)
+        else:
+            # PlaceboRequest converts headers when needed.
+            request_headers = request.headers
+        url = parse.urlparse(uri)
+        response = placebo._get_response(url,
+                                         request_headers,
+                                         request.body,
+                                         method=request.method,
+                                         responses=responses)
+        collector = stats.collector
+        if collector is not None:
+            response = collector.response(placebo, response)
+        response = timing.wait(response,
+                               placebo._get_timing(url,
+                                                   request_headers,
+                                                   request.body))
+        # httpretty writes whole response to a buffer
+        # before it is read, so streams are read here.
+        return (response.status,
+                response.get_headers(),
+                response.read_body())
+
+    def __enter__(self):
+        if self.placebo._get_record_path() is not None:
+            raise ValueError('Record mode is not supported by '
+                             'httpretty backend.')
+        if self.dynamic:
+            self._set_matcher(self.placebo._get_matcher())
+        if self.has_predicates:
+            raise ValueError('match_json and match_headers are not '
+                             'supported by httpretty backend.')
+        responses = self.placebo._get_responses()
+        # run-time check if httppretty is enabled.
+        # We must enable httpretty only once.
+        # This is necessary to chain
+        # multiple mock objects together.
+        is_owner = not httpretty.is_enabled()
+        if is_owner:
+            httpretty.reset()
+            httpretty.enable()
+        context = None
+        if copy_context is not None:
+            # Make sure current context has a request log to share.
+            requestlog.get_store()
+            context = copy_context()
+        entry = httpretty.Response(self.get_body)
+        httpretty.register_uri(getattr(httpretty, self.method),
+                               self.url,
+                               responses=[entry],
+                               match_querystring=self.match_querystring)
+        self._stack.append((is_owner, entry, context, responses))
+        self.placebo._activate()
+        return self.placebo
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        is_owner, entry, _context, _responses = self._stack.pop()
+        self.placebo._deactivate()
+        # Only registrations of this activation are removed,
+        # httpretty stays enabled for other placebo objects.
+        unregister(entry)
+        if is_owner and not _session:
+            httpretty.disable()
+            httpretty.reset()
+        elif _session and not httpretty.httpretty._entries:
+            # httpretty searches all requests it has seen before
+            # saving a new one. Do not let that list grow forever.
+            httpretty.httpretty.latest_requests = []
+
+
+def get_activation(placebo):
+    """Returns a reusable context manager that activates placebo."""
+    return Activation(placebo)
+
 
 def get_decorator(placebo):
     """Create a decorator for placebo object."""
-    def decorator(fun):
-        def _wrapper(*args, **kwargs):
-            def _run():
-                method = placebo._get_method()
-
-                def get_body(request, uri, _headers):
-                    # For some edge cases
-                    request_headers = dict(request.headers)
-                    # request_headers = headers
-                    url = parse.urlparse(uri)
-                    response_headers = placebo._get_headers(url,
-                                                            request_headers,
-                                                            request.body)
-
-                    response_body = placebo._get_body(url,
-                                                      request_headers,
-                                                      request.body)
-                    status = placebo._get_status(url,
-                                                 request_headers,
-                                                 request.body)
-                    return (status, response_headers, response_body)
-                    # return response.status, response.headers, response.data
-                url = placebo._get_url()
-                if isinstance(url, (parse.ParseResult, parse.SplitResult)):
-                    url = url.geturl()
-
-                httpretty.register_uri(getattr(httpretty, method),
-                                       url,
-                                       body=get_body)
-                response = fun(*args, **kwargs)
-                return response
-
-            # run-time check if httppretty is enabled.
-            # We must enable httpretty only once.
-            # This is necessary to chain
-            # multiple mock objects together.
-            if not httpretty.is_enabled():
-                _run = httpretty.activate(_run)
-            return _run()
-        return _wrapper
-    return decorator
+    return activation_decorator(get_activation(placebo))
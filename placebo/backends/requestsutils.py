@@ -0,0 +1,54 @@
+"""Helpers for backends that mock requests library."""
+import datetime
+from io import BytesIO
+
+import requests
+from requests import cookies
+from requests import structures
+from requests import utils
+
+from placebo.utils.streamutils import IteratorStream
+
+
+class _CookieHeaders(object):
+    """Headers interface that cookie jar expects from a response."""
+
+    def __init__(self, headers):
+        self.headers = headers
+
+    def get_all(self, name, failobj=None):
+        return self.getheaders(name)
+
+    def getheaders(self, name):
+        return [self.headers.get(name)]
+
+
+def build_response(placebo_response, request, stream=False):
+    """Create a requests.Response from a PlaceboResponse.
+
+    This does the same thing with httmock.response but skips
+    content type checks and encoding, since PlaceboResponse body
+    is already encoded.
+    """
+    res = requests.Response()
+    res.status_code = placebo_response.status
+    if not isinstance(placebo_response.body, bytes):
+        # Streams and file bodies will be read from raw by iter_content.
+        res.raw = IteratorStream(placebo_response.iter_body())
+    else:
+        res._content = placebo_response.body
+        res._content_consumed = True
+        res.raw = BytesIO(placebo_response.body if stream else b'')
+    res.headers = structures.CaseInsensitiveDict(placebo_response.headers)
+    res.encoding = utils.get_encoding_from_headers(res.headers)
+    res.elapsed = datetime.timedelta(0)
+    res.request = request
+    res.url = request.url
+    if 'set-cookie' in res.headers:
+        res.cookies.extract_cookies(
+            cookies.MockResponse(_CookieHeaders(res.headers)),
+            cookies.MockRequest(request))
+    res.raw.version = 11
+    # There is no connection to close.
+    res.close = lambda *args, **kwargs: None
+    return res
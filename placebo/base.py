@@ -1,9 +1,21 @@
 from functools import partial
 from functools import wraps
+import inspect
 import six
+from six.moves.urllib import parse
 
 from placebo import backends
+from placebo import cassette
+from placebo import requestlog
+from placebo import routing
+from placebo import sequence
+from placebo import stats
+from placebo import timing
 from placebo.request import PlaceboRequest
+from placebo.response import FileBody
+from placebo.response import PlaceboResponse
+from placebo.response import is_stream
+from placebo.utils import testcaseutils
 from placebo.utils.datautils import invoke_or_get
 
 
@@ -14,15 +26,56 @@ class PlaceboData(object):
     # Url that will be mocked
     url = NotImplemented
     body = NotImplemented
+    # Path of a file that will be used as body if body is not provided.
+    body_file = None
     headers = NotImplemented
+    # Optional callable that gets a PlaceboRequest and returns whole
+    # response as a PlaceboResponse or a (status, headers, body) tuple.
+    # If it is set, status, headers and body attributes are not used.
+    respond = None
+    # Responses that are served one by one (see placebo.sequence). Items
+    # are PlaceboResponse objects, (status, headers, body) tuples or
+    # respond callables. responses_policy is 'repeat_last', 'cycle' or
+    # 'exhaust'.
+    responses = None
+    responses_policy = sequence.REPEAT_LAST
     # Http method can be ('POST', 'GET', 'PUT', 'DELETE' etc.) default is 'GET'
     method = 'GET'
     # Http status code for response default is 200
     status = 200
+    # 'subset': requests must have query parameters of url (in any
+    # order). 'exact': requests must have only those parameters.
+    query_match = routing.QUERY_SUBSET
+    # Predicates for RPC style endpoints where different calls are sent
+    # to the same url. match_json is a (part of) json request body like
+    # {'method': 'getItems'} and match_headers is a dictionary of headers
+    # that request must have.
+    match_json = None
+    match_headers = None
     # Backend method for this instance
     backend = None
-    # Will be overritten in first request
-    last_request = None
+    # Path of a cassette file. If it is set, requests are not mocked.
+    # They are sent to target and exchanges are recorded to cassette.
+    record = None
+    # Url (like 'http://localhost:8000') that recorded requests are
+    # sent to. If it is not set, requests are sent to their own url.
+    target = None
+    # Simulated latency in seconds and bandwidth in bytes per second.
+    # They can be numbers, callables or placebo.timing distributions.
+    latency = None
+    bandwidth = None
+    # Maximum number of requests kept in request history.
+    history_size = 100
+    # Last request, request history and number of mocked requests.
+    # Instances keep their own history. Class history is shared by all
+    # instances. They are kept separately for each thread and asyncio task.
+    last_request = requestlog.LogAttribute('last_request')
+    history = requestlog.LogAttribute('history')
+    call_count = requestlog.LogAttribute('call_count')
+    # Precomputed response if body, headers and status are static.
+    _static_response = None
+    # PathTemplate of url if it has {name} parameters.
+    _url_template = None
 
     def __init__(self,
                  f=None,
@@ -31,7 +84,19 @@ class PlaceboData(object):
                  headers=None,
                  method=None,
                  status=None,
-                 backend=None):
+                 backend=None,
+                 history_size=None,
+                 body_file=None,
+                 record=None,
+                 target=None,
+                 latency=None,
+                 bandwidth=None,
+                 query_match=None,
+                 match_json=None,
+                 match_headers=None,
+                 respond=None,
+                 responses=None,
+                 responses_policy=None):
         """Initializer for placebo objects.
 
         Initializer will not be used directly. Placebo instances will be
@@ -58,22 +123,48 @@ class PlaceboData(object):
             self.status = status
         if backend is not None:
             self.backend = backend
+        if history_size is not None:
+            self.history_size = history_size
+        if body_file is not None:
+            self.body_file = body_file
+        if record is not None:
+            self.record = record
+        if target is not None:
+            self.target = target
+        if latency is not None:
+            self.latency = latency
+        if bandwidth is not None:
+            self.bandwidth = bandwidth
+        if query_match is not None:
+            self.query_match = query_match
+        if match_json is not None:
+            self.match_json = match_json
+        if match_headers is not None:
+            self.match_headers = match_headers
+        if respond is not None:
+            self.respond = respond
+        if responses is not None:
+            self.responses = responses
+        if responses_policy is not None:
+            self.responses_policy = responses_policy
 
-    def _get_body(self, url, headers, body):
+    def _get_body(self, url, headers, body, **params):
         # we want to keep latest request to use do tests
         self._set_last_request(url, headers, body)
         if self.body is NotImplemented:
+            if self.body_file is not None:
+                return FileBody.open(self.body_file)
             raise NotImplementedError('To use placebo, you need to either '
                                       'provide body attribute or '
                                       'overwrite get_body method in subclass.')
         else:
-            return invoke_or_get(self.body, url, headers, body)
+            return invoke_or_get(self.body, url, headers, body, **params)
 
-    def _get_headers(self, url, headers, body):
-        headers = self.headers
-        if headers is NotImplemented:
-            headers = {}
-        return invoke_or_get(headers, url, headers, body)
+    def _get_headers(self, url, headers, body, **params):
+        response_headers = self.headers
+        if response_headers is NotImplemented:
+            response_headers = {}
+        return invoke_or_get(response_headers, url, headers, body, **params)
 
     def _get_url(self):
         """
@@ -103,8 +194,224 @@ class PlaceboData(object):
                              (type(method), method))
         return method.upper()
 
-    def _get_status(self, url, headers, body):
-        return invoke_or_get(self.status, url, headers, body)
+    def _get_query_match(self):
+        return invoke_or_get(self.query_match)
+
+    def _get_match_json(self):
+        return invoke_or_get(self.match_json)
+
+    def _get_match_headers(self):
+        return invoke_or_get(self.match_headers)
+
+    def _get_status(self, url, headers, body, **params):
+        return invoke_or_get(self.status, url, headers, body, **params)
+
+    def _get_matcher(self):
+        """Returns compiled url matcher for backends.
+
+        Matcher is compiled once per class and shared by all instances.
+        It is keyed on evaluated url, method, query_match and predicates,
+        so it is compiled again if a callable returns a new value.
+        If they are overwritten on decorator, instance gets its own matcher.
+        """
+        key = (self._get_url(), self._get_method(), self._get_query_match(),
+               self._get_match_json(), self._get_match_headers())
+        instance_attrs = self.__dict__
+        if ('url' in instance_attrs or 'method' in instance_attrs or
+                'query_match' in instance_attrs or
+                'match_json' in instance_attrs or
+                'match_headers' in instance_attrs):
+            matcher = routing.Matcher(*key)
+        else:
+            cls = self.__class__
+            # Do not use cache of parent class.
+            cache = cls.__dict__.get('_matcher_cache')
+            # If values are changed, cache is invalidated.
+            if cache is not None and cache[0] == key:
+                matcher = cache[1]
+            else:
+                matcher = routing.Matcher(*key)
+                cls._matcher_cache = (key, matcher)
+        self._url_template = matcher.template
+        return matcher
+
+    def _has_dynamic_matcher(self):
+        """Returns True if url, method, query_match or predicates are
+        callables. Backends get matchers of those placebo objects again
+        for every activation."""
+        return any(six.callable(getattr(self, name))
+                   for name in ('url', 'method', 'query_match',
+                                'match_json', 'match_headers'))
+
+    def _get_static_response(self):
+        """Returns a precomputed PlaceboResponse if body, headers
+        and status are static values, otherwise returns None.
+
+        Backends call this method once on decoration. Like matchers,
+        static responses are cached on the class unless body, headers
+        or status is overwritten on decorator.
+        """
+        response = None
+        if ('body' in self.__dict__ or 'headers' in self.__dict__ or
+                'status' in self.__dict__ or 'body_file' in self.__dict__ or
+                'respond' in self.__dict__ or 'responses' in self.__dict__):
+            response = self._build_static_response()
+        else:
+            cls = self.__class__
+            cache = cls.__dict__.get('_static_response_cache')
+            key = (cls.body, cls.headers, cls.status, cls.body_file,
+                   cls.respond, cls.responses)
+            if (cache is not None and
+                    all(a is b for a, b in zip(cache[0], key))):
+                response = cache[1]
+            else:
+                response = self._build_static_response()
+                cls._static_response_cache = (key, response)
+        self._static_response = response
+        return response
+
+    def _build_static_response(self):
+        if self.respond is not None or self.responses is not None:
+            return None
+        # Subclasses that overwrite getters compute their own responses.
+        cls = self.__class__
+        for name in ('_get_status', '_get_headers', '_get_body'):
+            if (six.get_unbound_function(getattr(cls, name)) is not
+                    PlaceboData.__dict__[name]):
+                return None
+        body = self.body
+        if body is NotImplemented and self.body_file is not None:
+            body = FileBody.open(self.body_file)
+        if (body is NotImplemented or six.callable(body) or
+                six.callable(self.headers) or six.callable(self.status)):
+            return None
+        # Streams can be consumed only once.
+        if is_stream(body):
+            return None
+        headers = self.headers
+        if headers is NotImplemented:
+            headers = {}
+        return PlaceboResponse(self.status, headers, body)
+
+    def _get_response(self, url, headers, body, method='GET',
+                      responses=None):
+        """Returns a PlaceboResponse for given request.
+
+        If placebo is static, precomputed response is returned. If it has
+        a respond callable, it is called once with a PlaceboRequest.
+        If it has responses, next one is taken from ResponseSequence of
+        current activation. Otherwise status, body and headers are
+        computed for current request. Parameters of url template are
+        given to them as keyword arguments.
+        """
+        response = self._static_response
+        if response is not None:
+            self._set_last_request(url, headers, body)
+            return response
+        params = {}
+        if self._url_template is not None:
+            params = self._url_template.get_params(url.path) or {}
+        collector = stats.collector
+        respond = self.respond
+        if responses is not None:
+            respond = responses.next()
+            if not six.callable(respond):
+                self._set_last_request(url, headers, body)
+                return self._to_response(respond)
+        if respond is not None:
+            request = PlaceboRequest(url, headers, body, method, params)
+            self._log_request(request)
+            if collector is not None:
+                response = collector.call(self, 'respond', respond, request)
+            else:
+                response = respond(request)
+            return self._to_response(response)
+        if collector is not None:
+            call = collector.call
+            return PlaceboResponse(
+                call(self, 'status', self._get_status,
+                     url, headers, body, **params),
+                call(self, 'headers', self._get_headers,
+                     url, headers, body, **params),
+                call(self, 'body', self._get_body,
+                     url, headers, body, **params))
+        return PlaceboResponse(self._get_status(url, headers, body, **params),
+                               self._get_headers(url, headers, body, **params),
+                               self._get_body(url, headers, body, **params))
+
+    @staticmethod
+    def _to_response(response):
+        if isinstance(response, PlaceboResponse):
+            return response
+        return PlaceboResponse(*response)
+
+    def _get_responses(self):
+        """Returns a new ResponseSequence for an activation or None
+        if placebo does not have responses."""
+        responses = invoke_or_get(self.responses)
+        if responses is None:
+            return None
+        if (not six.callable(self.responses) and
+                iter(responses) is responses):
+            # Iterators (like generator objects) can be read only once.
+            raise ValueError('responses must be a list, a tuple or a '
+                             'callable that returns an iterable. '
+                             'Iterators cannot be reused by activations. '
+                             '(%s)' % self)
+        return sequence.ResponseSequence(
+            responses, invoke_or_get(self.responses_policy), repr(self))
+
+    def _get_timing(self, url, headers, body):
+        """Returns simulated timing of a request or None."""
+        latency = self.latency
+        bandwidth = self.bandwidth
+        if latency is None and bandwidth is None:
+            return None
+        collector = stats.collector
+        if collector is not None:
+            call = collector.call
+            return timing.Timing(
+                call(self, 'latency', timing.sample,
+                     latency, url, headers, body),
+                call(self, 'bandwidth', timing.sample,
+                     bandwidth, url, headers, body))
+        return timing.Timing(timing.sample(latency, url, headers, body),
+                             timing.sample(bandwidth, url, headers, body))
+
+    def _activate(self):
+        """Called by backends when placebo is activated."""
+
+    def _deactivate(self):
+        """Called by backends when placebo is deactivated."""
+
+    def _get_record_path(self):
+        """Returns cassette path if placebo is in record mode."""
+        record = invoke_or_get(self.record)
+        if record is None:
+            record = cassette.get_record_path()
+        return record
+
+    def _get_target_url(self, url):
+        """Returns url that a recorded request will be sent to."""
+        target = invoke_or_get(self.target)
+        if not target:
+            return url
+        target = parse.urlsplit(target)
+        url = parse.urlsplit(url)
+        return parse.urlunsplit((target.scheme,
+                                 target.netloc,
+                                 target.path.rstrip('/') + url.path,
+                                 url.query,
+                                 url.fragment))
+
+    def _record_exchange(self, path, method, url, headers, body,
+                         status, response_headers, response_body):
+        """Write a real exchange to cassette in record mode."""
+        self._set_last_request(url, headers, body)
+        exchange = cassette.make_exchange(method, url, headers, body,
+                                          status, response_headers,
+                                          response_body)
+        cassette.get_writer(path).write(exchange)
 
     @classmethod
     def _resolve_backend(cls):
@@ -127,13 +434,22 @@ class PlaceboData(object):
 
     @classmethod
     def _set_last_request_on_class(cls, request):
-        cls.last_request = request
+        # Each class has its own log, parent class log is not used.
+        requestlog.add(request, cls)
+
+    @classmethod
+    def reset_history(cls):
+        """Clear request history and call count of class
+        for current thread or task."""
+        requestlog.reset(cls)
 
     def _set_last_request(self, url, headers, body):
         """Set last request on body to keep track of changes"""
-        request = PlaceboRequest(url, headers, body)
+        self._log_request(PlaceboRequest(url, headers, body))
+
+    def _log_request(self, request):
         self._set_last_request_on_class(request)
-        self.last_request = request
+        requestlog.add(request, self)
 
 
 class Placebo(PlaceboData):
@@ -142,6 +458,8 @@ class Placebo(PlaceboData):
     @classmethod
     def mock(cls, f, arg_name=None, **kwargs):
         """Actual mock method."""
+        if inspect.isclass(f):
+            return cls._mock_test_case(f, arg_name, **kwargs)
         # create a placebo instance for backend
         placebo = cls(**kwargs)
         # choose a backend
@@ -155,6 +473,51 @@ class Placebo(PlaceboData):
         # wrap decorator around curent function.
         return wraps(f)(decorator(f))
 
+    @classmethod
+    def _mock_test_case(cls, test_case, arg_name=None, **kwargs):
+        """Activate one placebo instance for all tests of a TestCase
+        class. If arg_name is provided, instance is set as a class
+        attribute with that name."""
+        placebo = cls(**kwargs)
+        decorator = cls.get_backend()(placebo)
+        # Response sequences start over for each test.
+        test_case = testcaseutils.decorate_test_case(
+            test_case, decorator, per_test=placebo.responses is not None)
+        if arg_name is not None:
+            setattr(test_case, arg_name, placebo)
+        return test_case
+
+    @classmethod
+    def activate(cls, **kwargs):
+        """Returns a reusable context manager that activates a placebo
+        instance with given attributes.
+
+        Backend is chosen and url matcher is compiled once, when it is
+        created. It can be entered many times and it returns the
+        placebo instance:
+
+            with ItemsPlacebo.activate(status=500) as placebo:
+                ...
+        """
+        placebo = cls(**kwargs)
+        decorator = cls.get_backend()(placebo)
+        activation = getattr(decorator, 'activation', None)
+        if activation is None:
+            raise ValueError('Backend of %s does not support activation. '
+                             'Use decorate instead.' % cls.__name__)
+        return activation
+
+    @classmethod
+    def decorate_module(cls, module, **kwargs):
+        """Activate one placebo instance for all tests of a module
+        in its setUpModule. module can be a module object or its name.
+
+        Call it after setUpModule and tearDownModule functions
+        of module are defined."""
+        activation = cls.activate(**kwargs)
+        testcaseutils.decorate_module(module, activation)
+        return activation.placebo
+
     @classmethod
     def decorate(cls, *args, **kwargs):
         """Utility to use mock as decorator and decorator with args.
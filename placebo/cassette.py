@@ -0,0 +1,355 @@
+"""Cassette files for recording and replaying real http exchanges.
+
+A cassette is a JSON lines file. Every line is an exchange with
+following keys: method, url, headers, body, status, response_headers
+and response_body. Bodies that are not valid utf-8 are base64 encoded
+and have body_encoding/response_body_encoding set to 'base64'.
+"""
+import atexit
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+
+import six
+from six.moves.urllib import parse
+
+logger = logging.getLogger(__name__)
+
+# Number of exchanges kept in memory before they are written to file.
+DEFAULT_BUFFER_SIZE = 100
+
+# Cassette that all placebo objects record to. (see placebo.configure)
+_record_path = None
+# Open writers by absolute path.
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def encode_body(body):
+    """Returns (value, encoding) for a request or response body."""
+    if body is None:
+        return '', None
+    if isinstance(body, six.text_type):
+        return body, None
+    if not isinstance(body, six.binary_type):
+        # Streamed uploads cannot be recorded.
+        return '', None
+    try:
+        return body.decode('utf-8'), None
+    except UnicodeDecodeError:
+        return base64.b64encode(body).decode('ascii'), 'base64'
+
+
+def decode_body(value, encoding):
+    """Reverse of encode_body. Returns bytes."""
+    if encoding == 'base64':
+        return base64.b64decode(value)
+    return value.encode('utf-8')
+
+
+def make_exchange(method, url, headers, body,
+                  status, response_headers, response_body):
+    """Create a cassette line for an exchange."""
+    exchange = {
+        'method': method,
+        'url': url,
+        'headers': dict(headers or {}),
+        'status': status,
+        'response_headers': dict(response_headers or {}),
+    }
+    exchange['body'], encoding = encode_body(body)
+    if encoding:
+        exchange['body_encoding'] = encoding
+    exchange['response_body'], encoding = encode_body(response_body)
+    if encoding:
+        exchange['response_body_encoding'] = encoding
+    return exchange
+
+
+class CassetteWriter(object):
+    """Buffered cassette writer.
+
+    Exchanges are kept in memory and appended to cassette file in
+    batches. Remaining exchanges are written when process exits.
+    """
+
+    def __init__(self, path, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._lines = []
+        self._lock = threading.Lock()
+
+    def write(self, exchange):
+        line = json.dumps(exchange, sort_keys=True)
+        with self._lock:
+            self._lines.append(line)
+            if len(self._lines) >= self.buffer_size:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._lines:
+            return
+        data = u'\n'.join(self._lines) + u'\n'
+        self._lines = []
+        with io.open(self.path, 'a', encoding='utf-8') as f:
+            f.write(data)
+
+
+def get_writer(path):
+    """Returns shared writer for cassette path."""
+    path = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = CassetteWriter(path)
+    return writer
+
+
+def flush(path=None):
+    """Write buffered exchanges to cassette files.
+
+    If path is not given all cassettes are flushed.
+    """
+    if path is not None:
+        writer = _writers.get(os.path.abspath(path))
+        writers = [writer] if writer is not None else []
+    else:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush()
+
+
+atexit.register(flush)
+
+
+def set_record_path(path):
+    """Record all placebo objects to given cassette. None disables
+    global record mode."""
+    global _record_path
+    _record_path = path
+
+
+def get_record_path():
+    return _record_path
+
+
+def normalize_url(url):
+    """Normalize url for cassette lookups.
+
+    Scheme and host are lower cased, query parameters are sorted
+    and fragment is removed.
+    """
+    if not isinstance(url, (parse.ParseResult, parse.SplitResult)):
+        url = parse.urlsplit(url)
+    query = parse.urlencode(sorted(parse.parse_qsl(url.query,
+                                                   keep_blank_values=True)))
+    return parse.urlunsplit((url.scheme.lower(), url.netloc.lower(),
+                             url.path or '/', query, ''))
+
+
+def body_hash(body):
+    """Returns hash of a request body or None if body is empty."""
+    if not body:
+        return None
+    if isinstance(body, six.text_type):
+        body = body.encode('utf-8')
+    elif not isinstance(body, six.binary_type):
+        return None
+    return hashlib.sha1(body).hexdigest()
+
+
+class CassetteIndex(object):
+    """Index of a cassette file.
+
+    Index maps (method, normalized url, body hash) to offsets of lines in
+    cassette file. Exchanges are read from the file only when they are
+    matched. Index is saved next to the cassette (<cassette>.index) and
+    reused as long as cassette's mtime and size are not changed.
+    """
+    # Opened indexes by absolute path.
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    # Hop-by-hop and encoding headers that cannot be replayed as is.
+    skipped_headers = frozenset(['content-encoding', 'transfer-encoding',
+                                 'content-length', 'connection'])
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.index'
+        # (method, url) -> offset of last exchange.
+        self._urls = {}
+        # (method, url, body hash) -> offset of last exchange.
+        self._bodies = {}
+        self._file = None
+        # Number of active placebo objects that use the index. Cassette
+        # file is kept open while it is used.
+        self._users = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def open(cls, path):
+        """Returns a shared index for cassette path."""
+        path = os.path.abspath(path)
+        # Exchanges recorded in this process must be on disk.
+        flush(path)
+        with cls._cache_lock:
+            index = cls._cache.get(path)
+            stat = os.stat(path)
+            if index is None or index._stat != (stat.st_mtime,
+                                                stat.st_size):
+                index = cls._cache[path] = cls(path)
+        return index
+
+    def __len__(self):
+        return len(self._urls)
+
+    def _load(self):
+        stat = os.stat(self.path)
+        self._stat = (stat.st_mtime, stat.st_size)
+        entries = self._read_index_file()
+        if entries is None:
+            entries = self._build()
+            self._write_index_file(entries)
+        for method, url, digest, offset in entries:
+            self._urls[(method, url)] = offset
+            if digest is not None:
+                self._bodies[(method, url, digest)] = offset
+
+    def _build(self):
+        entries = []
+        with io.open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    exchange = json.loads(line.decode('utf-8'))
+                    body = decode_body(exchange.get('body', ''),
+                                       exchange.get('body_encoding'))
+                    entries.append((exchange['method'].upper(),
+                                    normalize_url(exchange['url']),
+                                    body_hash(body),
+                                    offset))
+                offset += len(line)
+        return entries
+
+    def _read_index_file(self):
+        try:
+            with io.open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if [data.get('mtime'), data.get('size')] != list(self._stat):
+            return None
+        return data['entries']
+
+    def _write_index_file(self, entries):
+        data = json.dumps({'mtime': self._stat[0],
+                           'size': self._stat[1],
+                           'entries': entries})
+        try:
+            with io.open(self.index_path, 'w', encoding='utf-8') as f:
+                f.write(six.text_type(data))
+        except (IOError, OSError) as e:
+            # Index cache is optional.
+            logger.debug('Could not write cassette index %s: %s',
+                         self.index_path, e)
+
+    def contains(self, method, url):
+        return (method, normalize_url(url)) in self._urls
+
+    def lookup(self, method, url, body=None):
+        """Returns recorded exchange for a request or None.
+
+        An exchange with same request body is preferred. If there is
+        not any, last exchange for method and url is returned.
+        """
+        url = normalize_url(url)
+        offset = None
+        digest = body_hash(body)
+        if digest is not None:
+            offset = self._bodies.get((method, url, digest))
+        if offset is None:
+            offset = self._urls.get((method, url))
+        if offset is None:
+            return None
+        return self.read(offset)
+
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+
+    def release(self):
+        """Close cassette file when last user is deactivated."""
+        with self._lock:
+            self._users -= 1
+            if self._users <= 0:
+                self._users = 0
+                self._close()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read(self, offset):
+        """Read exchange at given offset."""
+        with self._lock:
+            if self._file is None:
+                self._file = io.open(self.path, 'rb')
+            self._file.seek(offset)
+            line = self._file.readline()
+        return json.loads(line.decode('utf-8'))
+
+    def get_response_headers(self, exchange):
+        return dict((k, v)
+                    for k, v in exchange['response_headers'].items()
+                    if k.lower() not in self.skipped_headers)
+
+    def get_response_body(self, exchange):
+        return decode_body(exchange['response_body'],
+                           exchange.get('response_body_encoding'))
+
+
+class CassetteMatcher(object):
+    """Url matcher for a cassette.
+
+    Matches every method and url that has an exchange in cassette.
+    It is always kept in regex list of route tables.
+    """
+    key = None
+    template = None
+    url = None
+    method = None
+    json = None
+    headers = None
+
+    def __init__(self, index):
+        self.index = index
+
+    has_predicates = False
+
+    def match_request(self, request):
+        return True
+
+    def matches(self, method, url, request=None):
+        return self.index.contains(method, url)
+
+    def get_url_string(self):
+        raise ValueError('Cassette placebo objects can only be used by '
+                         'backends that use placebo route tables.')
+
+    def __repr__(self):
+        return '<CassetteMatcher %s>' % self.index.path
@@ -0,0 +1,36 @@
+"""Command line interface of placebo.
+
+    $ placebo serve myproject.mocks --port 8000 --workers 4
+"""
+import argparse
+import logging
+
+
+def serve(args):
+    # Server needs python 3, so it is only imported when it is used.
+    from placebo import server
+    server.serve(args.module, args.host, args.port, args.workers)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='placebo')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+    serve_parser = subparsers.add_parser(
+        'serve', help='Serve placebo classes of a module over http.')
+    serve_parser.add_argument('module',
+                              help='Dotted module name or path of a '
+                                   'python file that has placebo classes.')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('--workers', type=int, default=1,
+                              help='Number of processes that share the '
+                                   'port with SO_REUSEPORT.')
+    serve_parser.set_defaults(func=serve)
+    return parser
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    args = get_parser().parse_args(argv)
+    args.func(args)
@@ -0,0 +1,31 @@
+"""Process wide placebo configuration."""
+from placebo import backends
+from placebo import cassette
+from placebo import stats as stats_module
+
+# Marks arguments that are not given.
+NOT_SET = object()
+
+
+def configure(backend=None, record=NOT_SET, stats=NOT_SET):
+    """Configure placebo for current process.
+
+    backend: Backend callable or dotted path of it. It is used by all
+    placebo classes that do not have their own backend attribute.
+
+    record: Cassette path that all placebo objects record to. If it is
+    None, only placebo objects with record attribute are recorded.
+
+    stats: True enables instrumentation of placebo objects, a path
+    also writes its json report to that path when process exits.
+    False or None disables it. (see placebo.stats)
+    """
+    if backend is not None:
+        backends.set_backend(backend)
+    if record is not NOT_SET:
+        cassette.set_record_path(record)
+    if stats is not NOT_SET:
+        if not stats:
+            stats_module.disable()
+        else:
+            stats_module.enable(None if stats is True else stats)
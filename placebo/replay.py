@@ -0,0 +1,57 @@
+"""Placebo objects that replay recorded cassettes."""
+from placebo.base import Placebo
+from placebo.cassette import CassetteIndex
+from placebo.cassette import CassetteMatcher
+from placebo.response import PlaceboResponse
+from placebo.utils.datautils import invoke_or_get
+
+
+class CassettePlacebo(Placebo):
+    """Placebo that replays exchanges from a cassette file.
+
+    Every request that has a recorded exchange in the cassette (same
+    method and url) is mocked with recorded status, headers and body.
+    If there is an exchange with the same request body, it is preferred.
+    """
+    # Path of cassette file.
+    cassette = NotImplemented
+
+    def __init__(self, f=None, cassette=None, **kwargs):
+        super(CassettePlacebo, self).__init__(f, **kwargs)
+        if cassette is not None:
+            self.cassette = cassette
+        self._index = None
+
+    def _get_index(self):
+        if self._index is None:
+            if self.cassette is NotImplemented:
+                raise NotImplementedError('To use cassette placebo, you '
+                                          'need to provide cassette '
+                                          'attribute.')
+            self._index = CassetteIndex.open(invoke_or_get(self.cassette))
+        return self._index
+
+    def _get_matcher(self):
+        return CassetteMatcher(self._get_index())
+
+    def _activate(self):
+        self._get_index().acquire()
+
+    def _deactivate(self):
+        self._get_index().release()
+
+    def _get_static_response(self):
+        return None
+
+    def _get_response(self, url, headers, body, method='GET',
+                      responses=None):
+        self._set_last_request(url, headers, body)
+        index = self._get_index()
+        exchange = index.lookup(method, url, body)
+        if exchange is None:
+            # Matcher only matches recorded urls. This can happen only
+            # if backend does not give the request method.
+            return PlaceboResponse(404, {}, b'')
+        return PlaceboResponse(exchange['status'],
+                               index.get_response_headers(exchange),
+                               index.get_response_body(exchange))
@@ -1,26 +1,66 @@
+try:
+    from collections.abc import Mapping
+except ImportError:  # python 2
+    from collections import Mapping
+
 import six
 from six.moves.urllib import parse
 
 
 class PlaceboRequest(object):
-    """Utility class targeted to make inspecting requests easier."""
-    # Main Data Attributes
-    # Values will be filled in initializer.
-    url = None
-    parsed_url = None
-    headers = None
-    body = None
-
-    def __init__(self, url, headers, body):
-        if isinstance(url, (parse.ParseResult, parse.SplitResult)):
-            self.url = url.geturl()
-            self.parsed_url = url
-        elif isinstance(url, six.string_types):
-            self.url = url
-            self.parsed_url = parse.urlparse(url)
-
-        self.headers = headers
+    """Utility class targeted to make inspecting requests easier.
+
+    A request object is created for every mocked request, so url, query
+    and headers are parsed only when they are accessed for the first time.
+    """
+    __slots__ = ('_url', '_parsed_url', '_query',
+                 '_headers', '_raw_headers', 'body', 'method', 'params')
+
+    def __init__(self, url, headers, body, method=None, params=None):
+        if isinstance(url, six.string_types):
+            self._url = url
+            self._parsed_url = None
+        else:
+            # ParseResult or SplitResult
+            self._url = None
+            self._parsed_url = url
+        self._query = None
+        self._raw_headers = headers
+        self._headers = None
         self.body = body
+        self.method = method
+        # Parameters of url template.
+        self.params = params or {}
+
+    @property
+    def url(self):
+        if self._url is None and self._parsed_url is not None:
+            self._url = self._parsed_url.geturl()
+        return self._url
+
+    @property
+    def parsed_url(self):
+        if self._parsed_url is None and self._url is not None:
+            self._parsed_url = parse.urlparse(self._url)
+        return self._parsed_url
+
+    @property
+    def headers(self):
+        if self._headers is None:
+            headers = self._raw_headers
+            # Backends can give headers in their own types
+            # (like http.client.HTTPMessage). Convert them to dict.
+            if headers is not None and not isinstance(headers, Mapping):
+                headers = dict(headers)
+            self._headers = headers
+        return self._headers
+
+    @property
+    def query(self):
+        if self._query is None:
+            self._query = parse.parse_qs(self.parsed_url.query,
+                                         keep_blank_values=True)
+        return self._query
 
     def __str__(self):
         return '<PlaceboRequest %s>' % self.url
@@ -28,9 +68,4 @@ class PlaceboRequest(object):
     def __repr__(self):
         return 'PlaceboRequest(%s, %s, %s)' % (self.url,
                                                self.headers,
-                                               self.data)
-
-    @property
-    def query(self):
-        return parse.parse_qs(self.parsed_url.query,
-                              keep_blank_values=True)
+                                               self.body)
@@ -0,0 +1,83 @@
+"""Request history of placebo classes and instances.
+
+Every thread and asyncio task keeps its own request logs, so tests that
+run in parallel do not see each other's requests. Threads and tasks that
+are started from a context that already has logs (like tasks created
+inside a test) also add their requests to logs of that context.
+"""
+from collections import deque
+import weakref
+
+from placebo.utils.contextutils import ContextVar
+from placebo.utils.contextutils import get_owner
+
+
+class RequestLog(object):
+    """Mocked requests of a placebo class or instance."""
+    __slots__ = ('last_request', 'history', 'call_count')
+
+    def __init__(self, history_size):
+        self.last_request = None
+        self.history = deque(maxlen=history_size)
+        self.call_count = 0
+
+    def add(self, request):
+        self.last_request = request
+        self.history.append(request)
+        self.call_count += 1
+
+
+class LogStore(object):
+    """Request logs of a thread or asyncio task."""
+    __slots__ = ('owner', 'parent', 'logs')
+
+    def __init__(self, owner, parent):
+        self.owner = owner
+        self.parent = parent
+        # placebo class or instance -> RequestLog
+        self.logs = weakref.WeakKeyDictionary()
+
+    def get_log(self, placebo):
+        log = self.logs.get(placebo)
+        if log is None:
+            log = self.logs[placebo] = RequestLog(placebo.history_size)
+        return log
+
+
+_stores = ContextVar('placebo_request_logs', default=None)
+
+
+def get_store():
+    """Returns LogStore of current thread or task."""
+    store = _stores.get()
+    owner = get_owner()
+    if store is None or store.owner is not owner:
+        # Store is inherited from parent context or this is
+        # the first request of current thread or task.
+        store = LogStore(owner, store)
+        _stores.set(store)
+    return store
+
+
+def add(request, placebo):
+    """Add request to log of placebo (class or instance)."""
+    store = get_store()
+    while store is not None:
+        store.get_log(placebo).add(request)
+        store = store.parent
+
+
+def reset(placebo):
+    """Clear log of placebo for current thread or task."""
+    get_store().logs.pop(placebo, None)
+
+
+class LogAttribute(object):
+    """Reads an attribute of placebo's log for current thread or task."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        placebo = owner if instance is None else instance
+        return getattr(get_store().get_log(placebo), self.name)
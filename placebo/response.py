@@ -0,0 +1,151 @@
+import json
+import mmap
+import os
+
+import six
+
+# Default chunk size for streaming bodies.
+CHUNK_SIZE = 64 * 1024
+
+
+class FileBody(object):
+    """Response body that is served from a file.
+
+    File is memory mapped on first use and served as a memoryview of
+    the map, so body is never copied into python memory. Pages are
+    shared with other processes (like test workers) through the OS
+    page cache. Use FileBody.open to share same map in a process.
+    """
+    # Opened file bodies by absolute path.
+    _cache = {}
+
+    def __init__(self, path):
+        self.path = path
+        self._size = None
+        self._buffer = None
+
+    @classmethod
+    def open(cls, path):
+        """Returns a shared FileBody for given path."""
+        path = os.path.abspath(path)
+        body = cls._cache.get(path)
+        if body is None:
+            body = cls._cache[path] = cls(path)
+        return body
+
+    @property
+    def buffer(self):
+        """memoryview of file content."""
+        if self._buffer is None:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    # Empty files cannot be mapped.
+                    self._buffer = memoryview(b'')
+                else:
+                    self._buffer = memoryview(
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._buffer
+
+    def __len__(self):
+        if self._buffer is not None:
+            return len(self._buffer)
+        if self._size is None:
+            self._size = os.path.getsize(self.path)
+        return self._size
+
+    def __repr__(self):
+        return 'FileBody(%r)' % self.path
+
+
+def is_stream(body):
+    """Returns True if body is an iterator or a readable file object."""
+    if isinstance(body, (six.text_type, six.binary_type,
+                         bytearray, memoryview)):
+        return False
+    return hasattr(body, 'read') or hasattr(body, '__next__') or \
+        hasattr(body, 'next')
+
+
+class PlaceboResponse(object):
+    """Response that backends serve for a matched request.
+
+    Body is encoded to bytes and Content-Length header is computed
+    once when response is created. Headers are kept as a tuple of
+    (name, value) pairs, so a response can be shared between requests.
+
+    Dictionary and list bodies are encoded as json, like httmock does.
+    Body can also be an iterator (or generator) of chunks or a readable
+    file object. In that case body is streamed with iter_body and no
+    Content-Length header is added. FileBody bodies are served from
+    their memory map, so they are always sized.
+    """
+    __slots__ = ('status', 'headers', 'body', 'is_stream')
+
+    def __init__(self, status, headers, body):
+        self.is_stream = is_stream(body)
+        if body is None:
+            body = b''
+        elif isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        elif isinstance(body, six.text_type):
+            body = body.encode('utf-8')
+        elif not self.is_stream and not isinstance(
+                body, (six.binary_type, bytearray, memoryview, FileBody)):
+            raise ValueError('Body must be a string, bytes, dict, list, '
+                             'iterator or file object. (%r)' % (body,))
+        headers = dict(headers or {})
+        if not self.is_stream and \
+           not any(k.lower() == 'content-length' for k in headers):
+            headers['Content-Length'] = str(len(body))
+        self.status = status
+        self.headers = tuple(headers.items())
+        self.body = body
+
+    def iter_body(self, chunk_size=CHUNK_SIZE):
+        """Iterate over body as byte chunks."""
+        body = self.body
+        if isinstance(body, FileBody):
+            buf = body.buffer
+            for start in range(0, len(buf), chunk_size):
+                yield buf[start:start + chunk_size]
+        elif not self.is_stream:
+            if body:
+                yield body
+        elif hasattr(body, 'read'):
+            try:
+                while True:
+                    chunk = body.read(chunk_size)
+                    if not chunk:
+                        break
+                    if isinstance(chunk, six.text_type):
+                        chunk = chunk.encode('utf-8')
+                    yield chunk
+            finally:
+                # File is not needed once it is streamed.
+                body.close()
+        else:
+            for chunk in body:
+                if isinstance(chunk, six.text_type):
+                    chunk = chunk.encode('utf-8')
+                if chunk:
+                    yield chunk
+
+    def read_body(self):
+        """Returns whole body as bytes. Streaming bodies are consumed."""
+        if isinstance(self.body, FileBody):
+            return self.body.buffer.tobytes()
+        if not self.is_stream:
+            return self.body
+        return b''.join(self.iter_body())
+
+    def get_headers(self):
+        """Returns a new dictionary of response headers."""
+        return dict(self.headers)
+
+    def __str__(self):
+        return '<PlaceboResponse %s>' % self.status
+
+    def __repr__(self):
+        return 'PlaceboResponse(%s, %s, %r)' % (self.status,
+                                                self.headers,
+                                                self.body)
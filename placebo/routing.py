@@ -0,0 +1,680 @@
+"""Url matching for placebo backends.
+
+Backends that can do their own dispatching keep all active placebo
+instances in a single RouteTable. Exact urls are kept in a dictionary
+keyed on (method, scheme, netloc, path) so that lookups are a hash hit.
+Path templates (like http://api.com/items/{id}/) are kept in a trie of
+path segments, so matching time depends on length of the path instead
+of number of templates. Urls that have regular expressions in them are
+kept in a small ordered list and tried one by one.
+
+Query strings of urls are parsed once into a dictionary of sorted
+values. Requests match if they have all of those parameters (or exactly
+those parameters), in any order. Query string of a request is parsed
+once, only if a candidate route has query parameters.
+
+Routes can also have match_json and match_headers predicates (RPC style
+endpoints where every call is sent to the same url). Request body is
+decoded once, only if a candidate route has a json predicate. If more
+than one route of an exact url has json predicates, they are indexed on
+their most selective top level field (like operationName or method).
+"""
+import itertools
+import json
+import re
+
+import six
+from six.moves.urllib import parse
+
+# If netloc or path has any of those characters, url is
+# treated as a regular expression. ('.' is left out on purpose
+# because it is used in almost every host name.)
+REGEX_CHARS = re.compile(r'[\^\$\*\+\?\{\}\[\]\\\|\(\)]')
+REGEX_TYPE = type(REGEX_CHARS)
+# Parameters of path templates like {id}.
+TEMPLATE_PARAM = re.compile(r'\{([A-Za-z_][A-Za-z0-9_]*)\}')
+# Query strings are regular expressions if they have any of those
+# characters. ('+' is left out because it encodes spaces.)
+QUERY_REGEX_CHARS = re.compile(r'[\^\$\*\?\{\}\[\]\\\|\(\)]')
+# Values of Placebo.query_match.
+QUERY_SUBSET = 'subset'
+QUERY_EXACT = 'exact'
+
+
+def parse_query(query):
+    """Returns query string as a dictionary of name -> sorted tuple
+    of values."""
+    params = {}
+    # Same as parse_qsl with keep_blank_values, but most
+    # parameters do not need to be unquoted.
+    for pair in query.split('&'):
+        if not pair:
+            continue
+        name, _, value = pair.partition('=')
+        if '%' in pair or '+' in pair:
+            name = parse.unquote_plus(name)
+            value = parse.unquote_plus(value)
+        values = params.get(name)
+        if values is None:
+            params[name] = (value,)
+        else:
+            params[name] = tuple(sorted(values + (value,)))
+    return params
+
+
+def match_json(data, expected):
+    """Returns True if decoded json data has expected value. Objects
+    match if they have (at least) expected keys with matching values,
+    other values must be equal."""
+    if isinstance(expected, dict):
+        if not isinstance(data, dict):
+            return False
+        for name, value in expected.items():
+            if name not in data or not match_json(data[name], value):
+                return False
+        return True
+    return data == expected
+
+
+class Request(object):
+    """Query, headers and body of a request that is matched. Query,
+    headers and json body are parsed on first use."""
+    __slots__ = ('query', 'raw_headers', 'body',
+                 '_params', '_headers', '_json')
+
+    # Value of _json before body is decoded.
+    _not_decoded = object()
+
+    def __init__(self, query, headers=None, body=None):
+        self.query = query
+        self.raw_headers = headers
+        self.body = body
+        self._params = None
+        self._headers = None
+        self._json = self._not_decoded
+
+    @property
+    def params(self):
+        if self._params is None:
+            self._params = parse_query(self.query)
+        return self._params
+
+    @property
+    def headers(self):
+        """Headers with lower case names."""
+        if self._headers is None:
+            headers = self.raw_headers or {}
+            self._headers = dict((name.lower(), value)
+                                 for name, value in headers.items())
+        return self._headers
+
+    @property
+    def json(self):
+        """Decoded json body or None if body is not json."""
+        if self._json is self._not_decoded:
+            body = self.body
+            if isinstance(body, six.binary_type):
+                try:
+                    body = body.decode('utf-8')
+                except UnicodeDecodeError:
+                    body = None
+            try:
+                self._json = (json.loads(body)
+                              if isinstance(body, six.text_type) else None)
+            except ValueError:
+                self._json = None
+        return self._json
+
+
+class PathTemplate(object):
+    """Path with {name} parameters. A parameter matches a part of
+    a single path segment."""
+
+    def __init__(self, path):
+        self.path = path
+        self.segments = path.split('/')
+        self.names = TEMPLATE_PARAM.findall(path)
+        if len(set(self.names)) != len(self.names):
+            raise ValueError('Parameter names of path template must be '
+                             'unique. (%s)' % path)
+        self.regex = re.compile('^%s$' % self._to_regex(path))
+        # Segments that are not a single parameter are matched with
+        # their own regex in the trie.
+        self.segment_regexes = dict(
+            (segment, re.compile('^%s$' % self._to_regex(segment)))
+            for segment in self.segments
+            if TEMPLATE_PARAM.search(segment) and
+            not self.is_param(segment))
+
+    @staticmethod
+    def is_param(segment):
+        """Returns True if segment is a single parameter like {id}."""
+        match = TEMPLATE_PARAM.match(segment)
+        return match is not None and match.end() == len(segment)
+
+    @staticmethod
+    def _to_regex(path):
+        parts = []
+        position = 0
+        for param in TEMPLATE_PARAM.finditer(path):
+            parts.append(re.escape(path[position:param.start()]))
+            parts.append('(?P<%s>[^/]+)' % param.group(1))
+            position = param.end()
+        parts.append(re.escape(path[position:]))
+        return ''.join(parts)
+
+    @staticmethod
+    def is_template(url):
+        """Returns True if url has parameters in its path and no
+        regular expressions."""
+        return bool(url.scheme and url.netloc and
+                    TEMPLATE_PARAM.search(url.path) and
+                    not REGEX_CHARS.search(url.netloc) and
+                    not REGEX_CHARS.search(TEMPLATE_PARAM.sub('',
+                                                              url.path)))
+
+    def get_params(self, path):
+        """Returns parameters of path as a dictionary or None
+        if path does not match."""
+        match = self.regex.match(path)
+        return None if match is None else match.groupdict()
+
+
+class Matcher(object):
+    """Compiled url and method matcher for a placebo object.
+
+    Semantics of regex matchers are the same as httmock.urlmatch:
+    empty parts of the url match everything, netloc and path are
+    matched with re.match. If url is a compiled regex (httpretty
+    style), it is searched in the full url.
+
+    Query of url is a set of parameters that request must have (or
+    must have exactly if query_match is 'exact'). Queries that have
+    regular expression characters are matched with re.match.
+
+    match_json is matched with json body of request (see match_json
+    function), match_headers is a dictionary of headers that request
+    must have. Header names are case insensitive.
+
+    Matchers do not keep any reference to placebo objects, so same
+    matcher can be shared by every instance of a placebo class.
+    """
+
+    # compiled regex that is matched against the full url.
+    regex = None
+    # PathTemplate if url path has {name} parameters.
+    template = None
+
+    def __init__(self, url, method, query_match=QUERY_SUBSET,
+                 match_json=None, match_headers=None):
+        if query_match not in (QUERY_SUBSET, QUERY_EXACT):
+            raise ValueError('query_match must be %r or %r. (%s)' %
+                             (QUERY_SUBSET, QUERY_EXACT, query_match))
+        # Keep original url for backends that do their own matching.
+        self.url = url
+        self.method = method.upper()
+        if isinstance(url, REGEX_TYPE):
+            self.regex = url
+            url = parse.urlparse('')
+        elif isinstance(url, six.string_types):
+            url = parse.urlparse(url)
+        self.scheme = url.scheme
+        self.netloc = url.netloc
+        self.path = url.path
+        self.query = url.query
+        self.query_exact = query_match == QUERY_EXACT
+        # Parsed query parameters or None if query is not checked.
+        self.query_params = None
+        self.query_re = None
+        if QUERY_REGEX_CHARS.search(self.query):
+            self.query_re = re.compile(self.query)
+        elif self.query or (self.query_exact and self.regex is None):
+            self.query_params = parse_query(self.query)
+        self.json = match_json
+        # (lower case name, value) pairs or None.
+        self.headers = None
+        if match_headers:
+            self.headers = tuple((name.lower(), value)
+                                 for name, value in match_headers.items())
+        self.has_predicates = match_json is not None or bool(self.headers)
+
+        if PathTemplate.is_template(url):
+            self.key = None
+            self.template = PathTemplate(self.path)
+            self.netloc_re = None
+            self.path_re = None
+        elif self.is_exact(url):
+            self.key = (self.method, self.scheme, self.netloc, self.path)
+            self.netloc_re = None
+            self.path_re = None
+        else:
+            self.key = None
+            self.netloc_re = (re.compile(self.netloc)
+                              if self.netloc else None)
+            self.path_re = re.compile(self.path) if self.path else None
+
+    def get_url_string(self):
+        """Returns original url as a string or compiled regex.
+
+        Path templates and urls with query parameters are returned as
+        a regex of the full url. Query parameters must be matched with
+        httpretty's normalized query string (match_querystring=True).
+        """
+        if self.template is not None or (self.key is not None and
+                                         self.query_params is not None):
+            if self.template is not None:
+                path = self.template.regex.pattern[1:-1]
+            else:
+                path = re.escape(self.path)
+            return re.compile('^%s://%s%s%s' % (
+                re.escape(self.scheme), re.escape(self.netloc), path,
+                self.get_query_regex()))
+        if isinstance(self.url, (parse.ParseResult, parse.SplitResult)):
+            return self.url.geturl()
+        return self.url
+
+    @staticmethod
+    def is_exact(url):
+        """Returns True if url can be matched with a dictionary lookup."""
+        return bool(url.scheme and url.netloc and url.path and
+                    not REGEX_CHARS.search(url.netloc) and
+                    not REGEX_CHARS.search(url.path))
+
+    def get_query_regex(self):
+        """Returns regex of query parameters for httpretty."""
+        if self.query_params is None:
+            return '(\\?.*)?$'
+        pairs = sorted((name, value)
+                       for name, values in self.query_params.items()
+                       for value in values)
+        if self.query_exact:
+            if not pairs:
+                return '$'
+            return '\\?%s$' % re.escape(parse.urlencode(pairs))
+        return '\\?%s' % ''.join(
+            '(?=(?:.*&)?%s(?:&|$))' % re.escape(parse.urlencode([pair]))
+            for pair in pairs)
+
+    @classmethod
+    def from_placebo(cls, placebo):
+        return cls(placebo._get_url(), placebo._get_method(),
+                   placebo._get_query_match(), placebo._get_match_json(),
+                   placebo._get_match_headers())
+
+    def match_request(self, request):
+        """Check query, headers and body of a Request."""
+        if self.query_params is not None:
+            params = request.params
+            if self.query_exact:
+                if params != self.query_params:
+                    return False
+            else:
+                for name, values in self.query_params.items():
+                    request_values = params.get(name)
+                    # Most requests miss a parameter name.
+                    if request_values is None:
+                        return False
+                    for value in values:
+                        if value not in request_values:
+                            return False
+        elif (self.query_re is not None and
+              not self.query_re.match(request.query)):
+            return False
+        if self.has_predicates:
+            return self.match_predicates(request)
+        return True
+
+    def match_predicates(self, request):
+        if self.headers:
+            headers = request.headers
+            for name, value in self.headers:
+                if headers.get(name) != value:
+                    return False
+        return self.json is None or match_json(request.json, self.json)
+
+    def matches(self, method, url, request=None):
+        """Check method and url (SplitResult or ParseResult) against
+        matcher. This is only used for regex matchers. Exact matchers
+        are matched by RouteTable directly."""
+        if self.method != method:
+            return False
+        if request is None:
+            request = Request(url.query)
+        if self.regex is not None:
+            return (self.regex.search(url.geturl()) is not None and
+                    (not self.has_predicates or
+                     self.match_predicates(request)))
+        if self.template is not None:
+            return (self.scheme == url.scheme and
+                    self.netloc == url.netloc and
+                    self.template.regex.match(url.path) is not None and
+                    self.match_request(request))
+        if self.scheme and self.scheme != url.scheme:
+            return False
+        if self.netloc_re is not None and \
+           not self.netloc_re.match(url.netloc):
+            return False
+        if self.path_re is not None and not self.path_re.match(url.path):
+            return False
+        return self.match_request(request)
+
+    def __repr__(self):
+        return '<Matcher %s %s://%s%s>' % (self.method, self.scheme,
+                                           self.netloc, self.path)
+
+
+class Route(object):
+    """Placebo instance registered to a RouteTable."""
+    __slots__ = ('matcher', 'placebo', 'priority', 'responses', 'context')
+
+    def __init__(self, matcher, placebo, priority):
+        self.matcher = matcher
+        self.placebo = placebo
+        self.priority = priority
+        # ResponseSequence of placebo's activation.
+        self.responses = None
+        # Context that activated placebo if route is shared with other
+        # threads and tasks.
+        self.context = None
+
+
+class PredicateIndex(object):
+    """Hash index of routes of an exact url on a top level field of
+    their match_json predicates.
+
+    Field that has the most distinct values is selected. Routes that do
+    not have it are candidates for every request. If there is no such
+    field, all routes are candidates.
+    """
+    # Types of json values that can be indexed.
+    value_types = six.string_types + six.integer_types + (float, bool,
+                                                          type(None))
+
+    def __init__(self, routes):
+        # routes are given highest priority first.
+        self.routes = routes
+        self.field = self.select_field(routes)
+        # field value -> routes, highest priority first.
+        self.values = {}
+        # Routes that do not have field.
+        self.others = []
+        if self.field is None:
+            return
+        for route in routes:
+            expected = route.matcher.json
+            if (isinstance(expected, dict) and self.field in expected and
+                    isinstance(expected[self.field], self.value_types)):
+                self.values.setdefault(expected[self.field], []).append(route)
+            else:
+                # Routes without field and routes that expect an object
+                # or array in it are checked for every request.
+                self.others.append(route)
+
+    @classmethod
+    def select_field(cls, routes):
+        # field -> set of values
+        fields = {}
+        for route in routes:
+            expected = route.matcher.json
+            if not isinstance(expected, dict):
+                continue
+            for name, value in expected.items():
+                if isinstance(value, cls.value_types):
+                    fields.setdefault(name, set()).add(value)
+        fields = [(len(values), name) for name, values in fields.items()
+                  if len(values) > 1]
+        if not fields:
+            return None
+        return max(fields)[1]
+
+    def lookup(self, request):
+        """Returns routes that can match request, highest
+        priority first."""
+        if self.field is None:
+            return self.routes
+        routes = ()
+        data = request.json
+        if isinstance(data, dict) and self.field in data:
+            try:
+                routes = self.values.get(data[self.field], ())
+            except TypeError:
+                # Objects and arrays do not match indexed values.
+                pass
+        if not self.others:
+            return routes
+        if not routes:
+            return self.others
+        return sorted(routes + self.others,
+                      key=lambda route: route.priority, reverse=True)
+
+
+class _Node(object):
+    """Node of a TemplateRouter trie."""
+    __slots__ = ('literals', 'params', 'patterns', 'routes')
+
+    def __init__(self):
+        # segment -> node
+        self.literals = {}
+        # Node of segments that are a single parameter.
+        self.params = None
+        # [(segment regex, node)]
+        self.patterns = []
+        # Routes that end on this node, highest priority first.
+        self.routes = []
+
+
+class TemplateRouter(object):
+    """Trie of path template segments for each method, scheme and
+    netloc."""
+
+    def __init__(self, routes):
+        # (method, scheme, netloc) -> root node
+        self.roots = {}
+        # routes are given highest priority first.
+        for route in routes:
+            self.add(route)
+
+    def add(self, route):
+        matcher = route.matcher
+        template = matcher.template
+        node = self.roots.setdefault(
+            (matcher.method, matcher.scheme, matcher.netloc), _Node())
+        for segment in template.segments:
+            regex = template.segment_regexes.get(segment)
+            if regex is not None:
+                for pattern, child in node.patterns:
+                    if pattern is regex or pattern.pattern == regex.pattern:
+                        break
+                else:
+                    child = _Node()
+                    node.patterns.append((regex, child))
+            elif PathTemplate.is_param(segment):
+                if node.params is None:
+                    node.params = _Node()
+                child = node.params
+            else:
+                child = node.literals.get(segment)
+                if child is None:
+                    child = node.literals[segment] = _Node()
+            node = child
+        node.routes.append(route)
+
+    def match(self, method, url):
+        """Returns routes whose templates match url, highest
+        priority first."""
+        root = self.roots.get((method, url.scheme, url.netloc))
+        if root is None:
+            return []
+        found = []
+        self._walk(root, url.path.split('/'), 0, found)
+        if len(found) > 1:
+            found.sort(key=lambda route: route.priority, reverse=True)
+        return found
+
+    def _walk(self, node, segments, index, found):
+        if index == len(segments):
+            found.extend(node.routes)
+            return
+        segment = segments[index]
+        child = node.literals.get(segment)
+        if child is not None:
+            self._walk(child, segments, index + 1, found)
+        if not segment:
+            # Parameters do not match empty segments.
+            return
+        if node.params is not None:
+            self._walk(node.params, segments, index + 1, found)
+        for regex, child in node.patterns:
+            if regex.match(segment):
+                self._walk(child, segments, index + 1, found)
+
+
+class RouteTable(object):
+    """Route table for all active placebo instances.
+
+    Routes that are added later have higher priority. Since outer
+    decorators are activated first, innermost decorator wins if
+    more than one placebo matches the same request.
+    """
+
+    def __init__(self):
+        # exact routes: key -> list of routes, highest priority first.
+        self._exact = {}
+        # regex routes, highest priority first.
+        self._patterns = []
+        # path template routes, highest priority first.
+        self._templates = []
+        # TemplateRouter of template routes. It is built on first match.
+        self._router = None
+        # key -> PredicateIndex of exact routes. Indexes are built on
+        # first match of keys that have more than one route.
+        self._indexes = {}
+        # (method, scheme, netloc) -> path lengths of exact routes,
+        # longest first. It is built on first match.
+        self._path_lengths = None
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return (sum(len(routes) for routes in self._exact.values()) +
+                len(self._patterns) + len(self._templates))
+
+    def __bool__(self):
+        return bool(self._exact or self._patterns or self._templates)
+    __nonzero__ = __bool__
+
+    def add(self, matcher, placebo):
+        """Add a placebo to the table. Returned route must be used
+        to remove placebo from table."""
+        route = Route(matcher, placebo, next(self._counter))
+        if matcher.template is not None:
+            self._templates.insert(0, route)
+            self._router = None
+        elif matcher.key is None:
+            self._patterns.insert(0, route)
+        else:
+            self._exact.setdefault(matcher.key, []).insert(0, route)
+            self._indexes.pop(matcher.key, None)
+            self._path_lengths = None
+        return route
+
+    def copy(self):
+        """Returns a new table with same routes."""
+        table = RouteTable()
+        table._exact = dict((key, list(routes))
+                            for key, routes in self._exact.items())
+        table._patterns = list(self._patterns)
+        table._templates = list(self._templates)
+        # Priorities must keep increasing in copies.
+        table._counter = self._counter
+        return table
+
+    def find(self, placebo):
+        """Returns the latest route of placebo or None."""
+        best = None
+        for routes in ([self._patterns, self._templates] +
+                       list(self._exact.values())):
+            for route in routes:
+                if (route.placebo is placebo and
+                        (best is None or route.priority > best.priority)):
+                    best = route
+        return best
+
+    def remove(self, route):
+        if route.matcher.template is not None:
+            self._templates.remove(route)
+            self._router = None
+        elif route.matcher.key is None:
+            self._patterns.remove(route)
+        else:
+            routes = self._exact[route.matcher.key]
+            routes.remove(route)
+            self._indexes.pop(route.matcher.key, None)
+            if not routes:
+                del self._exact[route.matcher.key]
+                self._path_lengths = None
+
+    def match(self, method, url, headers=None, body=None):
+        """Returns the route that matches given method and url
+        (SplitResult or ParseResult). Headers and body are only used by
+        routes that have predicates. If there is no match returns None.
+        """
+        request = Request(url.query, headers, body)
+        exact = self._exact
+        path = url.path
+        best = self._match_exact((method, url.scheme, url.netloc, path),
+                                 request, None)
+        if exact:
+            lengths = self._path_lengths
+            if lengths is None:
+                lengths = self._path_lengths = self._get_path_lengths()
+            # Like httmock.urlmatch, paths of exact urls also match
+            # longer paths that start with them.
+            for length in lengths.get((method, url.scheme, url.netloc), ()):
+                if length < len(path):
+                    key = (method, url.scheme, url.netloc, path[:length])
+                    if key in exact:
+                        best = self._match_exact(key, request, best)
+        if self._templates:
+            router = self._router
+            if router is None:
+                # Tables are not changed once they are in use, so
+                # router is built once for each table.
+                router = self._router = TemplateRouter(self._templates)
+            for route in router.match(method, url):
+                if best is not None and route.priority < best.priority:
+                    break
+                if route.matcher.match_request(request):
+                    best = route
+                    break
+        for route in self._patterns:
+            if best is not None and route.priority < best.priority:
+                break
+            if route.matcher.matches(method, url, request):
+                best = route
+                break
+        return best
+
+    def _match_exact(self, key, request, best):
+        """Returns the best of given route and exact routes of key
+        that match request."""
+        routes = self._exact.get(key)
+        if not routes:
+            return best
+        if len(routes) > 1:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = PredicateIndex(routes)
+            routes = index.lookup(request)
+        for route in routes:
+            if best is not None and route.priority < best.priority:
+                break
+            if route.matcher.match_request(request):
+                return route
+        return best
+
+    def _get_path_lengths(self):
+        lengths = {}
+        for method, scheme, netloc, path in self._exact:
+            lengths.setdefault((method, scheme, netloc), set()).add(len(path))
+        return dict((key, sorted(values, reverse=True))
+                    for key, values in lengths.items())
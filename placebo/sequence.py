@@ -0,0 +1,91 @@
+"""Response sequences of placebo objects.
+
+A placebo with a responses attribute serves them one by one:
+
+    class FlakyPlacebo(Placebo):
+        url = 'http://www.acme.com/items/'
+        responses = [(503, {}, 'unavailable'),
+                     (200, {}, '[]')]
+
+Every activation of a placebo (every call of a decorated function) gets
+its own cursor, so sequences start over for each test. Cursors are
+shared by all threads and tasks of the activation and they are advanced
+atomically. Policy decides what is served after the last response:
+
+- 'repeat_last' (default): last response is served again.
+- 'cycle': sequence starts over.
+- 'exhaust': ResponsesExhausted is raised.
+
+responses can also be a callable that returns an iterable (like a
+generator function). It is called once for each activation and items
+are read only when they are needed, so sequences can be infinite.
+Iterators themselves cannot be used, because a new activation would
+find them already consumed.
+"""
+import threading
+
+# Values of Placebo.responses_policy.
+REPEAT_LAST = 'repeat_last'
+CYCLE = 'cycle'
+EXHAUST = 'exhaust'
+POLICIES = (REPEAT_LAST, CYCLE, EXHAUST)
+
+_end = object()
+
+
+class ResponsesExhausted(AssertionError):
+    """Raised when a placebo with 'exhaust' policy gets more requests
+    than it has responses. It fails tests like other assertions."""
+
+
+class ResponseSequence(object):
+    """Thread safe cursor over responses of an activated placebo.
+
+    Items are returned as they are given (PlaceboResponse objects,
+    tuples or callables), Placebo converts them to responses. Every
+    call takes constant time. Items of iterators are kept only if
+    policy needs them again.
+    """
+
+    def __init__(self, responses, policy=REPEAT_LAST, name='placebo'):
+        if policy not in POLICIES:
+            raise ValueError('responses_policy must be one of %s. (%s)' %
+                             (', '.join(repr(p) for p in POLICIES), policy))
+        self.policy = policy
+        self.name = name
+        self._lock = threading.Lock()
+        if isinstance(responses, (list, tuple)):
+            self._items = list(responses)
+            self._iterator = None
+        else:
+            self._items = []
+            self._iterator = iter(responses)
+        # Index of next item in _items.
+        self._position = 0
+
+    def next(self):
+        """Returns next item of the sequence."""
+        with self._lock:
+            items = self._items
+            if self._position < len(items):
+                self._position += 1
+                return items[self._position - 1]
+            if self._iterator is not None:
+                item = next(self._iterator, _end)
+                if item is not _end:
+                    if self.policy == CYCLE:
+                        items.append(item)
+                        self._position += 1
+                    elif self.policy == REPEAT_LAST:
+                        # Only last item is needed again.
+                        self._items = [item]
+                        self._position = 1
+                    return item
+                self._iterator = None
+            if not items or self.policy == EXHAUST:
+                raise ResponsesExhausted('All responses of %s are already '
+                                         'served.' % self.name)
+            if self.policy == CYCLE:
+                self._position = 1
+                return items[0]
+            return items[-1]
@@ -0,0 +1,382 @@
+"""Standalone http server that serves placebo classes.
+
+This module can only be imported on python 3.
+
+Placebo classes are matched with the same route table that backends use.
+Mocked upstreams usually have their own host names, so requests are
+matched against hosts of served placebo objects first and against their
+own Host header after that. Static responses are serialized once and
+written to the socket as they are.
+
+Multiple worker processes can listen on the same port with SO_REUSEPORT.
+"""
+import asyncio
+import importlib
+import inspect
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+
+from six.moves import http_client
+from six.moves.urllib import parse
+
+from placebo import routing
+from placebo.base import PlaceboData
+
+logger = logging.getLogger(__name__)
+
+# Largest request head that is accepted.
+MAX_HEAD_SIZE = 64 * 1024
+
+
+def load_module(name):
+    """Import a module from a dotted name or a file path."""
+    if name.endswith('.py') or os.path.sep in name:
+        module_name = os.path.splitext(os.path.basename(name))[0]
+        spec = importlib.util.spec_from_file_location(module_name, name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    # Console scripts do not have current directory in path.
+    if '' not in sys.path and os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    return importlib.import_module(name)
+
+
+def get_placebo_classes(module):
+    """Returns placebo classes that are defined in module."""
+    return [value for value in vars(module).values()
+            if inspect.isclass(value) and
+            issubclass(value, PlaceboData) and
+            value.__module__ == module.__name__ and
+            value.url is not NotImplemented]
+
+
+def serialize_head(status, headers, keep_alive=True, chunked=False):
+    """Returns status line and headers of a response as bytes."""
+    lines = ['HTTP/1.1 %d %s' % (status,
+                                 http_client.responses.get(status, ''))]
+    for name, value in headers:
+        lines.append('%s: %s' % (name, value))
+    if chunked:
+        lines.append('Transfer-Encoding: chunked')
+    if not keep_alive:
+        lines.append('Connection: close')
+    lines.append('\r\n')
+    return '\r\n'.join(lines).encode('latin-1')
+
+
+def iter_chunks(response):
+    """Iterate over body of response as it is written to socket.
+    Stream bodies are chunk encoded."""
+    if not response.is_stream:
+        for chunk in response.iter_body():
+            yield chunk
+        return
+    for chunk in response.iter_body():
+        yield b''.join([b'%x\r\n' % len(chunk), chunk, b'\r\n'])
+    yield b'0\r\n\r\n'
+
+
+class Server(object):
+    """Serves placebo objects over http."""
+
+    def __init__(self, placebos):
+        self.routes = routing.RouteTable()
+        origins = []
+        for placebo in placebos:
+            matcher = placebo._get_matcher()
+            placebo._get_static_response()
+            route = self.routes.add(matcher, placebo)
+            route.responses = placebo._get_responses()
+            if matcher.netloc:
+                origin = (matcher.scheme or 'http', matcher.netloc)
+                if origin not in origins:
+                    origins.append(origin)
+        self.origins = origins
+        # Lower case netloc -> origins of that host.
+        self._host_origins = {}
+        for origin in origins:
+            self._host_origins.setdefault(origin[1].lower(), []).append(origin)
+        # PlaceboResponse -> serialized response
+        self._static = {}
+
+    @classmethod
+    def from_module(cls, module):
+        if not inspect.ismodule(module):
+            module = load_module(module)
+        return cls([placebo_class()
+                    for placebo_class in get_placebo_classes(module)])
+
+    def match(self, method, target, host, headers=None, body=None):
+        """Returns matching route and url of request.
+
+        If Host header of request is one of the served origins, only
+        that origin is matched. Otherwise all origins are tried in order.
+        """
+        path, _, query = target.partition('?')
+        origins = self._host_origins.get(host.lower())
+        if origins is not None:
+            for scheme, netloc in origins:
+                url = parse.ParseResult(scheme, netloc, path, '', query, '')
+                route = self.routes.match(method, url, headers, body)
+                if route is not None:
+                    return route, url
+            return None, url
+        for scheme, netloc in self.origins:
+            url = parse.ParseResult(scheme, netloc, path, '', query, '')
+            route = self.routes.match(method, url, headers, body)
+            if route is not None:
+                return route, url
+        url = parse.ParseResult('http', host, path, '', query, '')
+        return self.routes.match(method, url, headers, body), url
+
+    def respond(self, transport, method, target, headers, body, keep_alive):
+        """Write response of a request to transport.
+
+        If placebo has a latency or bandwidth, returns a coroutine that
+        writes the response instead.
+        """
+        host = headers.get('Host') or headers.get('host') or ''
+        route, url = self.match(method, target, host, headers, body)
+        # Responses of HEAD requests do not have a body.
+        head = method == 'HEAD'
+        if route is None and head:
+            # HEAD requests get headers of GET responses.
+            route, url = self.match('GET', target, host, headers, body)
+        if route is None:
+            transport.write(self.get_error(404, keep_alive, head))
+            return None
+        placebo = route.placebo
+        response = placebo._static_response
+        try:
+            if response is None:
+                # Static responses are not logged, nobody can
+                # read request history of a server process.
+                response = placebo._get_response(url, headers, body,
+                                                 method=method,
+                                                 responses=route.responses)
+            timing = placebo._get_timing(url, headers, body)
+        except Exception:
+            logger.exception('Placebo %s failed.', placebo)
+            transport.write(self.get_error(500, keep_alive, head))
+            return None
+        if timing is not None:
+            return self.write_throttled(transport, response, timing,
+                                        keep_alive, head)
+        if head:
+            transport.write(serialize_head(response.status,
+                                           response.headers,
+                                           keep_alive,
+                                           chunked=response.is_stream))
+        elif (keep_alive and isinstance(response.body, bytes) and
+                response is placebo._static_response):
+            data = self._static.get(response)
+            if data is None:
+                data = self._static[response] = (
+                    serialize_head(response.status, response.headers) +
+                    response.body)
+            transport.write(data)
+        else:
+            transport.write(serialize_head(response.status,
+                                           response.headers,
+                                           keep_alive,
+                                           chunked=response.is_stream))
+            for chunk in iter_chunks(response):
+                transport.write(chunk)
+        return None
+
+    async def write_throttled(self, transport, response, timing, keep_alive,
+                              head=False):
+        """Write response after its latency with its bandwidth."""
+        await asyncio.sleep(timing.latency)
+        transport.write(serialize_head(response.status,
+                                       response.headers,
+                                       keep_alive,
+                                       chunked=response.is_stream))
+        if head:
+            return
+        if timing.bandwidth:
+            # Send about 50 pieces per second.
+            size = max(512, int(timing.bandwidth / 50))
+        for chunk in iter_chunks(response):
+            if transport.is_closing():
+                return
+            if not timing.bandwidth:
+                transport.write(chunk)
+                continue
+            for start in range(0, len(chunk), size):
+                piece = chunk[start:start + size]
+                await asyncio.sleep(timing.get_transfer_time(len(piece)))
+                transport.write(piece)
+
+    def get_error(self, status, keep_alive, head=False):
+        body = http_client.responses[status].encode('latin-1')
+        headers = (('Content-Type', 'text/plain'),
+                   ('Content-Length', str(len(body))))
+        if head:
+            return serialize_head(status, headers, keep_alive)
+        return serialize_head(status, headers, keep_alive) + body
+
+    async def start(self, host='127.0.0.1', port=8000, reuse_port=False):
+        """Start listening. Returns asyncio server."""
+        loop = asyncio.get_running_loop()
+        return await loop.create_server(lambda: HTTPProtocol(self),
+                                        host, port,
+                                        reuse_port=reuse_port or None)
+
+
+class HTTPProtocol(asyncio.Protocol):
+    """Minimal HTTP/1.1 protocol with keep-alive and pipelining."""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = b''
+        # Delayed response that is being written. Following requests
+        # of the connection wait until it is done.
+        self.pending = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        if self.pending is not None:
+            self.pending.cancel()
+
+    def data_received(self, data):
+        self.buffer = self.buffer + data if self.buffer else data
+        self.process()
+
+    def process(self):
+        while self.buffer and self.pending is None:
+            if not self.handle_request():
+                break
+
+    def wait(self, coroutine, keep_alive):
+        self.pending = asyncio.ensure_future(coroutine)
+
+        def done(future):
+            self.pending = None
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                logger.error('Response could not be written.',
+                             exc_info=future.exception())
+                self.transport.close()
+            elif not keep_alive:
+                self.transport.close()
+            else:
+                self.process()
+        self.pending.add_done_callback(done)
+
+    def handle_request(self):
+        """Handle first request in buffer. Returns False if
+        request is not fully received yet or connection is closed."""
+        buffer = self.buffer
+        end = buffer.find(b'\r\n\r\n')
+        if end < 0:
+            if len(buffer) > MAX_HEAD_SIZE:
+                self.close(431)
+            return False
+        lines = buffer[:end].decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            self.close(400)
+            return False
+        headers = {}
+        lower = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            name = name.strip()
+            headers[name] = lower[name.lower()] = value.strip()
+        if 'chunked' in lower.get('transfer-encoding', '').lower():
+            # Request bodies must have a Content-Length.
+            self.close(411)
+            return False
+        start = end + 4
+        try:
+            length = int(lower.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close(400)
+            return False
+        if len(buffer) < start + length:
+            return False
+        body = buffer[start:start + length]
+        self.buffer = buffer[start + length:]
+        connection = lower.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            keep_alive = connection == 'keep-alive'
+        else:
+            keep_alive = connection != 'close'
+        if target.startswith('http://') or target.startswith('https://'):
+            # Proxy style requests have absolute urls.
+            target = parse.urlunsplit(('', '') +
+                                      parse.urlsplit(target)[2:])
+        coroutine = self.server.respond(self.transport, method, target or '/',
+                                        headers, body, keep_alive)
+        if coroutine is not None:
+            self.wait(coroutine, keep_alive)
+            return False
+        if not keep_alive:
+            self.transport.close()
+            return False
+        return True
+
+    def close(self, status):
+        self.transport.write(self.server.get_error(status, False))
+        self.transport.close()
+        self.buffer = b''
+
+
+def run(module, host='127.0.0.1', port=8000, reuse_port=False):
+    """Serve placebo classes of module until process is stopped."""
+    server = Server.from_module(module)
+
+    async def serve():
+        listener = await server.start(host, port, reuse_port=reuse_port)
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(module, host='127.0.0.1', port=8000, workers=1):
+    """Serve placebo classes of module with given number of processes."""
+    # Load module once to show import errors before starting workers.
+    server = Server.from_module(module)
+    logger.info('Serving %d placebo objects on http://%s:%s with '
+                '%d worker(s).', len(server.routes), host, port, workers)
+    if workers <= 1:
+        run(module, host, port)
+        return
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        raise ValueError('Multiple workers need SO_REUSEPORT support.')
+    if not port:
+        raise ValueError('Multiple workers need a fixed port.')
+    processes = [multiprocessing.Process(target=run,
+                                         args=(module, host, port, True))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    def stop(signum, frame):
+        for process in processes:
+            process.terminate()
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop(None, None)
+        for process in processes:
+            process.join()
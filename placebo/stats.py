@@ -0,0 +1,207 @@
+"""Optional instrumentation of placebo objects.
+
+When it is enabled, following numbers are kept for each placebo class:
+number of served responses (hits), bytes of served response bodies,
+time spent matching requests to it and time spent in each attribute
+(body, headers, status, latency, bandwidth) that is computed for a
+request. Time is in seconds.
+
+    stats.enable('placebo-stats.json')
+    ...
+    stats.get_stats(ItemsPlacebo).hits
+
+Report is written to given path when process exits. Instrumentation is
+disabled by default and costs a single check on every request then.
+"""
+import atexit
+import collections
+import json
+import threading
+import timeit
+
+from placebo.response import PlaceboResponse
+
+# Number of samples that are kept for percentiles.
+DEFAULT_SAMPLE_SIZE = 10000
+
+# Active collector or None if instrumentation is disabled.
+collector = None
+# Path that report is written at exit.
+_report_path = None
+_atexit_registered = False
+
+_timer = timeit.default_timer
+
+
+class TimeStat(object):
+    """Count, total and percentiles of measured times."""
+
+    def __init__(self, sample_size=DEFAULT_SAMPLE_SIZE):
+        self.count = 0
+        self.total = 0.0
+        # Percentiles are computed from latest samples.
+        self.samples = collections.deque(maxlen=sample_size)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        samples = sorted(self.samples)
+        index = min(len(samples) - 1, int(len(samples) * p / 100.0))
+        return samples[index]
+
+    def as_dict(self):
+        return {'count': self.count,
+                'total': self.total,
+                'mean': self.total / self.count if self.count else None,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99),
+                'max': max(self.samples) if self.samples else None}
+
+
+class PlaceboStats(object):
+    """Numbers of a placebo class."""
+
+    def __init__(self):
+        self.hits = 0
+        self.bytes = 0
+        self.match = TimeStat()
+        # attribute name -> TimeStat
+        self.calls = {}
+
+    def as_dict(self):
+        return {'hits': self.hits,
+                'bytes': self.bytes,
+                'match': self.match.as_dict(),
+                'calls': dict((name, stat.as_dict())
+                              for name, stat in self.calls.items())}
+
+
+class Collector(object):
+    """Keeps stats of placebo classes. It is shared by all threads."""
+
+    def __init__(self):
+        # placebo class -> PlaceboStats
+        self.stats = {}
+        # Requests that did not match any placebo.
+        self.unmatched = TimeStat()
+        self._lock = threading.Lock()
+
+    def _get(self, placebo):
+        cls = placebo if isinstance(placebo, type) else placebo.__class__
+        stats = self.stats.get(cls)
+        if stats is None:
+            stats = self.stats.setdefault(cls, PlaceboStats())
+        return stats
+
+    def match(self, routes, method, url, headers=None, body=None):
+        """Match a request with a route table and time it."""
+        start = _timer()
+        route = routes.match(method, url, headers, body)
+        elapsed = _timer() - start
+        with self._lock:
+            if route is None:
+                self.unmatched.add(elapsed)
+            else:
+                self._get(route.placebo).match.add(elapsed)
+        return route
+
+    def call(self, placebo, name, f, *args, **kwargs):
+        """Call f with args and add its time to attribute name."""
+        start = _timer()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            elapsed = _timer() - start
+            with self._lock:
+                calls = self._get(placebo).calls
+                stat = calls.get(name)
+                if stat is None:
+                    stat = calls[name] = TimeStat()
+                stat.add(elapsed)
+
+    def add_bytes(self, placebo, size):
+        with self._lock:
+            self._get(placebo).bytes += size
+
+    def response(self, placebo, response):
+        """Count a served response. Returns the response that should
+        be served, stream bodies are counted while they are read."""
+        with self._lock:
+            stats = self._get(placebo)
+            stats.hits += 1
+            if not response.is_stream:
+                stats.bytes += len(response.body)
+                return response
+        return PlaceboResponse(response.status, response.headers,
+                               self._count(placebo, response.iter_body()))
+
+    def _count(self, placebo, chunks):
+        for chunk in chunks:
+            self.add_bytes(placebo, len(chunk))
+            yield chunk
+
+    def get_report(self):
+        with self._lock:
+            placebos = dict(('%s.%s' % (cls.__module__, cls.__name__),
+                             stats.as_dict())
+                            for cls, stats in self.stats.items())
+            return {'placebos': placebos,
+                    'unmatched': self.unmatched.as_dict()}
+
+
+def enable(report_path=None):
+    """Start collecting stats. If report_path is given, report is
+    written to it when process exits. Collected stats are kept if
+    instrumentation is already enabled."""
+    global collector, _report_path, _atexit_registered
+    if collector is None:
+        collector = Collector()
+    _report_path = report_path
+    if report_path is not None and not _atexit_registered:
+        atexit.register(_dump_at_exit)
+        _atexit_registered = True
+
+
+def disable():
+    """Stop collecting stats and drop collected ones."""
+    global collector, _report_path
+    collector = None
+    _report_path = None
+
+
+def reset():
+    """Drop collected stats."""
+    global collector
+    if collector is not None:
+        collector = Collector()
+
+
+def get_stats(placebo_class):
+    """Returns PlaceboStats of a placebo class or None."""
+    if collector is None:
+        return None
+    return collector.stats.get(placebo_class)
+
+
+def get_report():
+    """Returns collected stats as a json serializable dictionary."""
+    if collector is None:
+        return {'placebos': {}, 'unmatched': TimeStat().as_dict()}
+    return collector.get_report()
+
+
+def dump(path):
+    """Write report to a json file."""
+    with open(path, 'w') as f:
+        json.dump(get_report(), f, indent=2, sort_keys=True)
+
+
+def _dump_at_exit():
+    if collector is not None and _report_path is not None:
+        dump(_report_path)
@@ -0,0 +1,217 @@
+"""Simulated latency and bandwidth.
+
+Placebo objects can have ``latency`` (seconds before response is
+returned) and ``bandwidth`` (bytes per second) attributes. In process
+backends wait through the clock of current thread or task. By default it
+is the real clock. A VirtualClock only moves its time forward, so tests
+can check elapsed time without sleeping:
+
+    with VirtualClock() as clock:
+        requests.get(url)
+        assert clock.time() == 0.5
+"""
+import math
+import random
+import time
+
+from placebo.response import PlaceboResponse
+from placebo.utils.contextutils import ContextVar
+from placebo.utils.datautils import invoke_or_get
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+class Clock(object):
+    """Real clock."""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def asleep(self, seconds):
+        """Returns an awaitable that sleeps."""
+        return asyncio.sleep(max(seconds, 0))
+
+
+class VirtualClock(Clock):
+    """Clock that moves forward when it sleeps without waiting.
+
+    It can be used as a context manager to use it in current thread
+    or task.
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self._tokens = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+    def asleep(self, seconds):
+        self.sleep(seconds)
+        return asyncio.sleep(0)
+
+    def __enter__(self):
+        self._tokens.append(_clock.get())
+        _clock.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _clock.set(self._tokens.pop())
+
+
+_default_clock = Clock()
+_clock = ContextVar('placebo_clock', default=None)
+
+
+def get_clock():
+    """Returns clock of current thread or task."""
+    return _clock.get() or _default_clock
+
+
+def set_clock(clock):
+    """Set clock that is used when there is no clock in
+    current thread or task. None sets real clock back."""
+    global _default_clock
+    _default_clock = clock or Clock()
+
+
+#################
+# Distributions #
+#################
+
+class Distribution(object):
+    """Random values for latency and bandwidth attributes.
+
+    Give a seed to get the same values on every run.
+    """
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def sample(self):
+        raise NotImplementedError()
+
+
+class Uniform(Distribution):
+
+    def __init__(self, low, high, seed=None):
+        super(Uniform, self).__init__(seed)
+        self.low = low
+        self.high = high
+
+    def sample(self):
+        return self.random.uniform(self.low, self.high)
+
+
+class Exponential(Distribution):
+
+    def __init__(self, mean, seed=None):
+        super(Exponential, self).__init__(seed)
+        self.mean = mean
+
+    def sample(self):
+        return self.random.expovariate(1.0 / self.mean)
+
+
+class LogNormal(Distribution):
+    """Log-normal distribution with given median and sigma."""
+
+    def __init__(self, median, sigma, seed=None):
+        super(LogNormal, self).__init__(seed)
+        self.mu = math.log(median)
+        self.sigma = sigma
+
+    def sample(self):
+        return self.random.lognormvariate(self.mu, self.sigma)
+
+
+class Percentiles(Distribution):
+    """Distribution from percentiles of a real upstream.
+
+    Percentiles({50: 0.02, 99: 0.3, 100: 1.5}) returns values between
+    percentiles with linear interpolation. Values below the lowest
+    percentile get the lowest value.
+    """
+
+    def __init__(self, percentiles, seed=None):
+        super(Percentiles, self).__init__(seed)
+        self.points = sorted(percentiles.items())
+
+    def sample(self):
+        p = self.random.uniform(0, 100)
+        low_p, low_value = 0, self.points[0][1]
+        for high_p, high_value in self.points:
+            if p <= high_p:
+                if high_p == low_p:
+                    return high_value
+                ratio = (p - low_p) / float(high_p - low_p)
+                return low_value + (high_value - low_value) * ratio
+            low_p, low_value = high_p, high_value
+        return low_value
+
+
+def sample(value, url, headers, body):
+    """Returns value of a latency or bandwidth attribute for a request."""
+    if value is None:
+        return None
+    if isinstance(value, Distribution):
+        return value.sample()
+    return invoke_or_get(value, url, headers, body)
+
+
+##########
+# Timing #
+##########
+
+class Timing(object):
+    """Latency and bandwidth of a request."""
+    __slots__ = ('latency', 'bandwidth')
+
+    def __init__(self, latency, bandwidth):
+        self.latency = latency or 0
+        self.bandwidth = bandwidth
+
+    def get_transfer_time(self, size):
+        if not self.bandwidth:
+            return 0
+        return size / float(self.bandwidth)
+
+    def get_delay(self, response):
+        """Returns seconds until response is fully received.
+        Streams are throttled while they are read."""
+        if response.is_stream:
+            return self.latency
+        return self.latency + self.get_transfer_time(len(response.body))
+
+    def iter_body(self, response, clock):
+        for chunk in response.iter_body():
+            clock.sleep(self.get_transfer_time(len(chunk)))
+            yield chunk
+
+
+def wait(response, timing, clock=None):
+    """Wait for latency and bandwidth of a response.
+
+    Returns the response that should be served. Streams are
+    throttled while they are read.
+    """
+    if timing is None:
+        return response
+    if clock is None:
+        clock = get_clock()
+    clock.sleep(timing.get_delay(response))
+    if response.is_stream and timing.bandwidth:
+        return PlaceboResponse(response.status, response.headers,
+                               timing.iter_body(response, clock))
+    return response
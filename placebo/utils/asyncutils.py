@@ -0,0 +1,36 @@
+"""Asyncio helpers. This module can only be imported on python 3."""
+from functools import wraps
+
+
+def activation_coroutine(f, activation):
+    """Wrap coroutine function f so it runs inside activation."""
+    @wraps(f)
+    async def wrapper(*args, **kwargs):
+        with activation:
+            return await f(*args, **kwargs)
+    return wrapper
+
+
+async def aiter_body(placebo_response, chunk_size=None, timing=None,
+                     clock=None):
+    """Iterate over body of a PlaceboResponse asynchronously.
+
+    If timing is given, stream bodies are throttled with its bandwidth.
+    """
+    if chunk_size is None:
+        chunks = placebo_response.iter_body()
+    else:
+        chunks = placebo_response.iter_body(chunk_size)
+    throttle = (timing is not None and timing.bandwidth and
+                placebo_response.is_stream)
+    for chunk in chunks:
+        if throttle:
+            await clock.asleep(timing.get_transfer_time(len(chunk)))
+        yield bytes(chunk)
+
+
+async def wait(placebo_response, timing, clock):
+    """Wait for simulated latency of a response without
+    blocking event loop. Streams are throttled while they are read."""
+    if timing is not None:
+        await clock.asleep(timing.get_delay(placebo_response))
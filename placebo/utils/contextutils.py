@@ -0,0 +1,42 @@
+"""Helpers to keep state per thread and asyncio task."""
+import threading
+
+try:
+    from contextvars import ContextVar
+    from contextvars import copy_context
+except ImportError:
+    ContextVar = None
+    copy_context = None
+
+try:
+    import asyncio
+    _get_running_loop = asyncio._get_running_loop
+except (ImportError, AttributeError):
+    asyncio = None
+
+
+if ContextVar is None:
+    class ContextVar(object):
+        """Thread local replacement for python versions
+        without contextvars module."""
+
+        def __init__(self, name, default=None):
+            self.name = name
+            self.default = default
+            self._local = threading.local()
+
+        def get(self):
+            return getattr(self._local, 'value', self.default)
+
+        def set(self, value):
+            self._local.value = value
+
+
+def get_owner():
+    """Returns current asyncio task, or current thread if there
+    is no running task."""
+    if asyncio is not None and _get_running_loop() is not None:
+        task = asyncio.current_task()
+        if task is not None:
+            return task
+    return threading.current_thread()
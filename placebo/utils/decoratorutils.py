@@ -0,0 +1,31 @@
+"""Decorator helpers for backends."""
+from functools import wraps
+import inspect
+
+
+def is_coroutine_function(f):
+    """Returns True if f is an 'async def' function."""
+    iscoroutinefunction = getattr(inspect, 'iscoroutinefunction', None)
+    return iscoroutinefunction is not None and iscoroutinefunction(f)
+
+
+def activation_decorator(activation):
+    """Returns a decorator that runs functions inside activation.
+
+    activation is a reusable context manager. If decorated function is
+    a coroutine function, activation stays active while coroutine runs.
+    """
+    def decorator(f):
+        if is_coroutine_function(f):
+            # Coroutines are only supported on python 3.
+            from placebo.utils.asyncutils import activation_coroutine
+            return activation_coroutine(f, activation)
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with activation:
+                return f(*args, **kwargs)
+        return wrapper
+    # Test cases and modules are activated once with the activation.
+    decorator.activation = activation
+    return decorator
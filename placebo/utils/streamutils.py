@@ -0,0 +1,29 @@
+"""Utilities for streaming response bodies."""
+import io
+
+
+class IteratorStream(io.RawIOBase):
+    """Read only file object that reads its data from an iterator of
+    byte chunks. It is used as raw stream of mocked responses so
+    clients can consume big bodies chunk by chunk.
+    """
+
+    def __init__(self, iterator):
+        self._iterator = iter(iterator)
+        # Remaining part of last chunk.
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        buf = self._buffer
+        while not buf:
+            try:
+                buf = next(self._iterator)
+            except StopIteration:
+                return 0
+        size = len(b)
+        chunk, self._buffer = buf[:size], buf[size:]
+        b[:len(chunk)] = chunk
+        return len(chunk)
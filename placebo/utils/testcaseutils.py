@@ -0,0 +1,90 @@
+"""Helpers to activate placebo objects for whole test cases and modules."""
+import sys
+import unittest
+
+import six
+
+AsyncTestCase = getattr(unittest, 'IsolatedAsyncioTestCase', None)
+
+
+def decorate_test_methods(test_case, decorator):
+    """Decorate every test method of a TestCase class."""
+    for name in unittest.TestLoader().getTestCaseNames(test_case):
+        setattr(test_case, name, decorator(getattr(test_case, name)))
+    return test_case
+
+
+def decorate_test_case(test_case, decorator, per_test=False):
+    """Activate placebo of decorator in setUpClass and deactivate it in
+    tearDownClass of a TestCase class.
+
+    Async test cases copy current context when they are created, so
+    they cannot see placebo objects activated in setUpClass. Their test
+    methods (and test methods of backends that have no activation) are
+    decorated one by one. With per_test (placebo objects that keep
+    state for each activation), test methods are decorated too.
+    """
+    if not issubclass(test_case, unittest.TestCase):
+        raise ValueError('Only unittest.TestCase classes can be '
+                         'decorated. (%s)' % test_case)
+    activation = getattr(decorator, 'activation', None)
+    if activation is None or per_test or (
+            AsyncTestCase is not None and
+            issubclass(test_case, AsyncTestCase)):
+        return decorate_test_methods(test_case, decorator)
+    set_up = test_case.__dict__.get('setUpClass')
+    tear_down = test_case.__dict__.get('tearDownClass')
+
+    def setUpClass(cls):
+        activation.__enter__()
+        try:
+            if set_up is None:
+                super(test_case, cls).setUpClass()
+            else:
+                set_up.__get__(None, cls)()
+        except Exception:
+            # tearDownClass is not called if setUpClass fails.
+            activation.__exit__(*sys.exc_info())
+            raise
+
+    def tearDownClass(cls):
+        try:
+            if tear_down is None:
+                super(test_case, cls).tearDownClass()
+            else:
+                tear_down.__get__(None, cls)()
+        finally:
+            activation.__exit__(None, None, None)
+
+    test_case.setUpClass = classmethod(setUpClass)
+    test_case.tearDownClass = classmethod(tearDownClass)
+    return test_case
+
+
+def decorate_module(module, activation):
+    """Enter activation in setUpModule and exit it in tearDownModule
+    of a test module. module can be a module object or its name."""
+    if isinstance(module, six.string_types):
+        module = sys.modules[module]
+    set_up = getattr(module, 'setUpModule', None)
+    tear_down = getattr(module, 'tearDownModule', None)
+
+    def setUpModule():
+        activation.__enter__()
+        try:
+            if set_up is not None:
+                set_up()
+        except Exception:
+            activation.__exit__(*sys.exc_info())
+            raise
+
+    def tearDownModule():
+        try:
+            if tear_down is not None:
+                tear_down()
+        finally:
+            activation.__exit__(None, None, None)
+
+    module.setUpModule = setUpModule
+    module.tearDownModule = tearDownModule
+    return module
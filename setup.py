@@ -25,14 +25,19 @@ setup(
     url='https://github.com/huseyinyilmaz/placebo',
     author='Huseyin Yilmaz',
     author_email='yilmazhuseyin@gmail.com',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     include_package_data=True,
     zip_safe=False,
     test_suite='tests',
+    entry_points={
+        'console_scripts': ['placebo = placebo.cli:main'],
+    },
     tests_require=[
         'six',
         'requests',
         'httmock',
         'httpretty',
+        'httpx; python_version >= "3.8"',
+        'aiohttp; python_version >= "3.8"',
     ],
 )
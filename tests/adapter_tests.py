@@ -0,0 +1,100 @@
+"""Tests for requests transport adapter backend."""
+import json
+import unittest
+
+import requests
+from requests import adapters
+
+from placebo import Placebo
+from placebo.backends import adapterbackend
+from tests import utils
+
+
+class AdapterMock(Placebo):
+    item = {'name': 'Huseyin', 'last_name': 'Yilmaz'}
+    url = 'http://www.example.com/api/item'
+    body = json.dumps(item)
+    headers = {'custom-header': 'OK',
+               'set-cookie': 'session=1'}
+    backend = adapterbackend.get_decorator
+
+
+class MountedMock(AdapterMock):
+    backend = adapterbackend.get_mounted_decorator
+
+
+class AdapterTestCase(unittest.TestCase):
+
+    @AdapterMock.decorate(arg_name='mock')
+    def test_global(self, mock):
+        self.assertIsNot(adapters.HTTPAdapter.send,
+                         adapterbackend._http_adapter_send)
+        response = requests.get(AdapterMock.url)
+        self.assertEqual(response.json(), AdapterMock.item)
+        self.assertEqual(response.headers['custom-header'], 'OK')
+        self.assertEqual(response.cookies['session'], '1')
+        self.assertEqual(mock.call_count, 1)
+
+    def test_global_uninstall(self):
+        AdapterMock.decorate(lambda: None)()
+        self.assertIs(adapters.HTTPAdapter.send,
+                      adapterbackend._http_adapter_send)
+        self.assertIsNone(adapterbackend.get_dispatcher())
+
+    @MountedMock.decorate
+    def test_mounted(self):
+        # Nothing is patched for mounted adapters.
+        self.assertIs(adapters.HTTPAdapter.send,
+                      adapterbackend._http_adapter_send)
+        session = requests.Session()
+        session.mount('http://', adapterbackend.PlaceboAdapter())
+        response = session.get(MountedMock.url)
+        self.assertEqual(response.json(), MountedMock.item)
+
+    @MountedMock.decorate
+    @MountedMock.decorate(url='http://www.example.com/api/other',
+                          body='other')
+    def test_mounted_stacked(self):
+        session = requests.Session()
+        session.mount('http://', adapterbackend.PlaceboAdapter())
+        response = session.get('http://www.example.com/api/other')
+        self.assertEqual(response.text, 'other')
+        self.assertEqual(session.get(MountedMock.url).json(),
+                         MountedMock.item)
+
+    @AdapterMock.decorate(body='global')
+    @MountedMock.decorate(body='mounted')
+    def test_mounted_and_global(self):
+        session = requests.Session()
+        session.mount('http://', adapterbackend.PlaceboAdapter())
+        self.assertEqual(session.get(MountedMock.url).text, 'mounted')
+        self.assertEqual(requests.get(AdapterMock.url).text, 'global')
+
+    @MountedMock.decorate
+    def test_mounted_no_match(self):
+        session = requests.Session()
+        session.mount('http://', adapterbackend.PlaceboAdapter())
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            session.get('http://www.example.com/api/unknown')
+
+    @MountedMock.decorate
+    def test_mounted_fallback(self):
+        server, target = utils.start_target_server()
+        try:
+            session = requests.Session()
+            session.mount('http://', adapterbackend.PlaceboAdapter(
+                fallback=adapters.HTTPAdapter()))
+            response = session.get(target + '/real')
+            self.assertEqual(response.json()['path'], '/real')
+            self.assertEqual(session.get(MountedMock.url).json(),
+                             MountedMock.item)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @MountedMock.decorate(body=lambda *args: (b'x' * 10 for i in range(3)))
+    def test_mounted_stream(self):
+        session = requests.Session()
+        session.mount('http://', adapterbackend.PlaceboAdapter())
+        response = session.get(MountedMock.url, stream=True)
+        self.assertEqual(b''.join(response.iter_content(5)), b'x' * 30)
@@ -0,0 +1,154 @@
+"""Tests for async backend and async decorated functions."""
+import json
+import unittest
+
+from placebo import Placebo
+from tests import utils
+
+try:
+    from placebo.backends import asyncbackend
+except (ImportError, SyntaxError):
+    asyncbackend = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+AsyncTestCase = getattr(unittest, 'IsolatedAsyncioTestCase',
+                        unittest.TestCase)
+
+
+class AsyncMock(Placebo):
+    item = {'name': 'Huseyin', 'last_name': 'Yilmaz'}
+    url = 'http://www.example.com/api/item'
+    body = json.dumps(item)
+    headers = {'custom-header': 'OK'}
+    backend = asyncbackend and asyncbackend.get_decorator
+
+
+class AsyncStreamMock(AsyncMock):
+    url = 'http://www.example.com/api/download'
+
+    def body(self, request_url, request_headers, request_body):
+        for i in range(10):
+            yield b'x' * 1024
+
+
+@unittest.skipIf(asyncbackend is None or
+                 AsyncTestCase is unittest.TestCase,
+                 'Async backend needs python 3.8 and httpx or aiohttp.')
+class AsyncBackendTestCase(AsyncTestCase):
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    @AsyncMock.decorate
+    @AsyncMock.decorate(method='POST', status=201, arg_name='mock')
+    async def test_httpx(self, mock):
+        async with httpx.AsyncClient() as client:
+            response = await client.get(AsyncMock.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), AsyncMock.item)
+            self.assertEqual(response.headers['custom-header'], 'OK')
+            response = await client.post(AsyncMock.url, content=b'data')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(mock.last_request.body, b'data')
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    @AsyncMock.decorate
+    def test_httpx_sync_client(self):
+        response = httpx.get(AsyncMock.url)
+        self.assertEqual(response.json(), AsyncMock.item)
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    @AsyncStreamMock.decorate
+    async def test_httpx_stream(self):
+        async with httpx.AsyncClient() as client:
+            async with client.stream('GET', AsyncStreamMock.url) as response:
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+        self.assertEqual(size, 10 * 1024)
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    @AsyncMock.decorate
+    async def test_httpx_transport(self):
+        transport = asyncbackend.PlaceboTransport()
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.get(AsyncMock.url)
+            self.assertEqual(response.json(), AsyncMock.item)
+            with self.assertRaises(httpx.ConnectError):
+                await client.get('http://www.example.com/other')
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    @AsyncMock.decorate
+    @AsyncMock.decorate(method='POST', status=500, arg_name='mock')
+    async def test_aiohttp(self, mock):
+        async with aiohttp.ClientSession() as session:
+            async with session.get(AsyncMock.url) as response:
+                self.assertEqual(response.status, 200)
+                self.assertEqual(await response.json(), AsyncMock.item)
+                self.assertEqual(response.headers['Custom-Header'], 'OK')
+            response = await session.post(AsyncMock.url, json={'a': 1})
+            self.assertEqual(response.status, 500)
+            with self.assertRaises(aiohttp.ClientResponseError):
+                response.raise_for_status()
+        self.assertEqual(json.loads(mock.last_request.body), {'a': 1})
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    @AsyncMock.decorate(match_headers={'X-Token': 'secret'}, arg_name='mock')
+    async def test_aiohttp_session_defaults(self, mock):
+        async with aiohttp.ClientSession(
+                base_url='http://www.example.com',
+                headers={'X-Token': 'secret'}) as session:
+            async with session.get('/api/item') as response:
+                self.assertEqual(await response.json(), AsyncMock.item)
+        self.assertEqual(mock.last_request.url, AsyncMock.url)
+        self.assertEqual(mock.last_request.headers['X-Token'], 'secret')
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    @AsyncStreamMock.decorate
+    async def test_aiohttp_stream(self):
+        async with aiohttp.ClientSession() as session:
+            async with session.get(AsyncStreamMock.url) as response:
+                chunks = [chunk async for chunk in
+                          response.content.iter_chunked(512)]
+        self.assertEqual(len(chunks), 20)
+
+    @AsyncMock.decorate
+    async def test_concurrent_requests(self):
+        import asyncio
+        if httpx is None:
+            self.skipTest('httpx is not installed')
+        async with httpx.AsyncClient() as client:
+            responses = await asyncio.gather(
+                *[client.get(AsyncMock.url) for i in range(1000)])
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+
+    def test_dispatcher_is_uninstalled(self):
+        self.assertIsNone(asyncbackend.get_dispatcher())
+
+    def test_record_mode_is_not_supported(self):
+        with self.assertRaises(ValueError):
+            with AsyncMock.activate(record='items.jsonl'):
+                pass
+        self.assertIsNone(asyncbackend.get_dispatcher())
+
+
+@unittest.skipIf(AsyncTestCase is unittest.TestCase,
+                 'Async functions need python 3.8')
+class AsyncFunctionTestCase(AsyncTestCase):
+
+    @utils.BasePlacebo.decorate(url=AsyncMock.url, body='body',
+                                arg_name='mock')
+    async def test_async_function_with_sync_backend(self, mock):
+        import asyncio
+        # Mock must be still active after an await.
+        await asyncio.sleep(0)
+        if utils.is_httmock:
+            from placebo.backends import httmockbackend
+            self.assertIsNotNone(httmockbackend.get_dispatcher())
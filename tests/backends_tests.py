@@ -0,0 +1,40 @@
+"""Tests for backend resolution."""
+import os
+import unittest
+
+import placebo
+from placebo import backends
+from tests import utils
+
+
+class BackendResolutionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.environ = os.environ.get(backends.ENVIRONMENT_VARIABLE)
+        backends.set_backend(None)
+
+    def tearDown(self):
+        if self.environ is None:
+            os.environ.pop(backends.ENVIRONMENT_VARIABLE, None)
+        else:
+            os.environ[backends.ENVIRONMENT_VARIABLE] = self.environ
+        backends.set_backend(None)
+
+    def test_backend_is_resolved_once(self):
+        backend = backends.get_backend()
+        # Changing environment does not change resolved backend.
+        os.environ[backends.ENVIRONMENT_VARIABLE] = 'invalid.backend'
+        self.assertIs(backends.get_backend(), backend)
+
+    def test_environment_variable(self):
+        os.environ[backends.ENVIRONMENT_VARIABLE] = utils.httpretty_path
+        self.assertEqual(backends.get_backend_name(), utils.httpretty_path)
+
+    def test_configure(self):
+        placebo.configure(backend=utils.backend_str)
+        self.assertIs(backends.get_backend(), utils.backend)
+        self.assertEqual(backends.get_backend_name(), utils.backend_str)
+        placebo.configure(backend=utils.backend)
+        self.assertIs(backends.get_backend(), utils.backend)
+        with self.assertRaises(ValueError):
+            placebo.configure(backend=1)
@@ -0,0 +1,24 @@
+"""Tests for benchmark suite."""
+import unittest
+
+from benchmarks import run
+
+
+class BenchmarkTestCase(unittest.TestCase):
+
+    def test_run_case(self):
+        result = run.run_case('httmock', 'request_static', None, 2, 2)
+        self.assertEqual(result['backend'], 'httmock')
+        self.assertEqual(result['case'], 'request_static')
+        self.assertLessEqual(result['min_us'], result['median_us'])
+
+    def test_compare(self):
+        baseline = {'results': [
+            {'backend': 'httmock', 'case': 'stacked', 'param': 10,
+             'median_us': 10.0}]}
+        results = [{'backend': 'httmock', 'case': 'stacked', 'param': 10,
+                    'median_us': 15.0}]
+        regressions = run.compare(results, baseline, 1.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0]['ratio'], 1.5)
+        self.assertEqual(run.compare(results, baseline, 2), [])
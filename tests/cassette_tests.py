@@ -0,0 +1,157 @@
+"""Tests for recording and replaying cassettes."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+import placebo
+from placebo import CassettePlacebo
+from placebo import cassette
+from tests import utils
+
+
+class RecordMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/item'
+    method = 'POST'
+    body = 'not used in record mode'
+
+
+@unittest.skipIf(utils.is_httpretty,
+                 "Record mode is not supported by httpretty")
+class RecordTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.target = utils.start_target_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cassette.jsonl')
+
+    def tearDown(self):
+        placebo.configure(record=None)
+        shutil.rmtree(self.directory)
+
+    def read_cassette(self):
+        cassette.flush(self.path)
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_record(self):
+        @RecordMock.decorate(record=self.path, target=self.target,
+                             arg_name='mock')
+        def run(mock):
+            response = requests.post(RecordMock.url + '?page=2',
+                                     data='request body')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json(),
+                             {'method': 'POST',
+                              'path': '/api/item?page=2',
+                              'body': 'request body'})
+            self.assertEqual(mock.call_count, 1)
+        run()
+        exchanges = self.read_cassette()
+        self.assertEqual(len(exchanges), 1)
+        exchange = exchanges[0]
+        self.assertEqual(exchange['method'], 'POST')
+        self.assertEqual(exchange['url'], RecordMock.url + '?page=2')
+        self.assertEqual(exchange['body'], 'request body')
+        self.assertEqual(exchange['status'], 201)
+        self.assertEqual(exchange['response_headers']['Content-Type'],
+                         'application/json')
+        self.assertEqual(json.loads(exchange['response_body'])['path'],
+                         '/api/item?page=2')
+
+    def test_writes_are_buffered(self):
+        placebo.configure(record=self.path)
+
+        @RecordMock.decorate(target=self.target)
+        def run():
+            for i in range(3):
+                requests.post(RecordMock.url)
+        run()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(len(self.read_cassette()), 3)
+
+
+class ItemsCassette(CassettePlacebo):
+    backend = utils.backend
+
+
+@unittest.skipIf(utils.is_httpretty,
+                 "Cassette replay is not supported by httpretty")
+class ReplayTestCase(unittest.TestCase):
+
+    url = 'http://www.example.com/api/items'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cassette.jsonl')
+        exchanges = [
+            cassette.make_exchange('GET', self.url + '?b=2&a=1', {}, '',
+                                   200, {'Content-Length': '2'}, b'[]'),
+            cassette.make_exchange('POST', self.url, {}, '{"id": 1}',
+                                   201, {}, b'{"id": 1}'),
+            cassette.make_exchange('POST', self.url, {}, '{"id": 2}',
+                                   201, {}, b'{"id": 2}'),
+            cassette.make_exchange('GET', self.url + '/1', {}, '',
+                                   404, {}, b'\xff\xfe'),
+        ]
+        with open(self.path, 'w') as f:
+            for exchange in exchanges:
+                f.write(json.dumps(exchange) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_replay(self):
+        @ItemsCassette.decorate(cassette=self.path, arg_name='mock')
+        def run(mock):
+            # Query parameter order does not matter.
+            response = requests.get(self.url + '?a=1&b=2')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), [])
+            # Exchange with same body is chosen.
+            response = requests.post(self.url, data='{"id": 1}')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json(), {'id': 1})
+            # Otherwise last exchange is used.
+            response = requests.post(self.url, data='{"id": 3}')
+            self.assertEqual(response.json(), {'id': 2})
+            # Binary bodies
+            response = requests.get(self.url + '/1')
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.content, b'\xff\xfe')
+            self.assertEqual(mock.call_count, 4)
+            return mock._get_index()
+        index = run()
+        # Cassette file is closed when placebo is deactivated.
+        self.assertIsNone(index._file)
+
+    def test_unrecorded_urls_are_not_matched(self):
+        @utils.BasePlacebo.decorate(url=self.url + '/2', body='other')
+        @ItemsCassette.decorate(cassette=self.path)
+        def run():
+            response = requests.get(self.url + '/2')
+            self.assertEqual(response.text, 'other')
+        run()
+
+    def test_index_file(self):
+        index = cassette.CassetteIndex(self.path)
+        self.assertEqual(len(index), 3)
+        self.assertTrue(os.path.exists(index.index_path))
+        # Second index is read from index file.
+        os.remove(self.path + '.index')
+        with open(self.path + '.index', 'w') as f:
+            f.write(json.dumps({'mtime': index._stat[0],
+                                'size': index._stat[1],
+                                'entries': []}))
+        self.assertEqual(len(cassette.CassetteIndex(self.path)), 0)
@@ -0,0 +1,152 @@
+"""Tests for placebo objects that are used by multiple threads and tasks."""
+import json
+import threading
+import unittest
+
+import requests
+
+from placebo import Placebo
+from placebo.backends import adapterbackend
+from tests import utils
+
+AsyncTestCase = getattr(unittest, 'IsolatedAsyncioTestCase',
+                        unittest.TestCase)
+
+
+class ThreadMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/thread'
+    body = json.dumps({'thread': None})
+
+
+class MountedMock(Placebo):
+    url = 'http://www.example.com/api/mounted'
+    body = 'mounted'
+    backend = adapterbackend.get_mounted_decorator
+
+
+def mounted_session():
+    session = requests.Session()
+    session.mount('http://', adapterbackend.PlaceboAdapter())
+    return session
+
+
+def run_threads(target, count):
+    errors = []
+
+    def run(i):
+        try:
+            target(i)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+@unittest.skipIf(utils.is_httpretty,
+                 'httpretty mocks are shared by all threads')
+class ThreadTestCase(unittest.TestCase):
+
+    def test_threads_see_their_own_mocks(self):
+        ThreadMock.reset_history()
+        barrier = threading.Barrier(4)
+
+        def target(i):
+            @ThreadMock.decorate(body=json.dumps({'thread': i}),
+                                 arg_name='mock')
+            def run(mock):
+                # Make sure all threads are active at the same time.
+                barrier.wait()
+                for _ in range(i + 1):
+                    response = requests.get(ThreadMock.url)
+                    self.assertEqual(response.json(), {'thread': i})
+                barrier.wait()
+                self.assertEqual(mock.call_count, i + 1)
+                self.assertEqual(ThreadMock.call_count, i + 1)
+            run()
+        run_threads(target, 4)
+        self.assertIsNone(ThreadMock.last_request)
+
+    def test_shared_decorator(self):
+        barrier = threading.Barrier(2)
+        bodies = {}
+
+        @MountedMock.decorate(arg_name='mock')
+        def run(mock, i):
+            barrier.wait()
+            bodies[i] = mounted_session().get(MountedMock.url).text
+            barrier.wait()
+            self.assertEqual(mock.call_count, 1)
+            return mock
+
+        run_threads(lambda i: run(i=i), 2)
+        self.assertEqual(bodies, {0: 'mounted', 1: 'mounted'})
+
+    def test_inactive_thread(self):
+        activated = threading.Event()
+        finished = threading.Event()
+        call_counts = []
+
+        @MountedMock.decorate(arg_name='mock')
+        def run(mock):
+            activated.set()
+            finished.wait()
+            call_counts.append(mock.call_count)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        try:
+            activated.wait()
+            # Threads without their own placebo objects use placebo
+            # objects of all threads.
+            response = mounted_session().get(MountedMock.url)
+            self.assertEqual(response.text, 'mounted')
+        finally:
+            finished.set()
+            thread.join()
+        # Request is logged to thread that activated placebo.
+        self.assertEqual(call_counts, [1])
+        self.assertIsNone(MountedMock.last_request)
+
+    @ThreadMock.decorate(arg_name='mock')
+    def test_thread_pool(self, mock):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(2) as executor:
+            responses = list(executor.map(requests.get,
+                                          [ThreadMock.url] * 4))
+        self.assertEqual([r.json() for r in responses],
+                         [{'thread': None}] * 4)
+        self.assertEqual(mock.call_count, 4)
+
+
+@unittest.skipIf(AsyncTestCase is unittest.TestCase,
+                 'Async functions need python 3.8')
+class TaskTestCase(AsyncTestCase):
+
+    async def test_tasks_see_their_own_mocks(self):
+        import asyncio
+
+        @MountedMock.decorate(arg_name='mock')
+        async def outer(mock):
+            @MountedMock.decorate(body='inner', arg_name='inner_mock')
+            async def inner(inner_mock):
+                await asyncio.sleep(0)
+                body = mounted_session().get(MountedMock.url).text
+                self.assertEqual(inner_mock.call_count, 1)
+                return body
+
+            async def plain():
+                await asyncio.sleep(0)
+                return mounted_session().get(MountedMock.url).text
+
+            bodies = await asyncio.gather(inner(), plain())
+            self.assertEqual(bodies, ['inner', 'mounted'])
+            # Requests of child tasks are logged to parent too.
+            self.assertEqual(mock.call_count, 1)
+            self.assertEqual(MountedMock.call_count, 2)
+
+        await outer()
@@ -1,9 +1,12 @@
 """Tests for main placebo interface and functionality."""
 import json
+import os
 import re
 import unittest
 import requests
+from placebo import FileBody
 from placebo import Placebo
+from placebo import PlaceboResponse
 from tests import utils
 import six
 from six.moves.urllib import parse
@@ -48,16 +51,15 @@ class GetDynamicMock(utils.BasePlacebo):
 class DecoratorTestCase(unittest.TestCase):
 
     def assertHeadersEqual(self, heads_a, heads_b):
-        """Do not test for common headers for httpretty.
+        """Do not test for common headers.
 
         Since httpretty is a socket level library, other libraries
-        before the socket adds common headers. So we are removing
-        common headers for httpretty.
+        before the socket adds common headers. Placebo responses also
+        have a computed content-length header. So we are removing
+        common headers.
         """
-        if utils.is_httpretty:
-            heads_a = utils.remove_common_headers(heads_a)
-            heads_b = utils.remove_common_headers(heads_b)
-
+        heads_a = utils.remove_common_headers(heads_a)
+        heads_b = utils.remove_common_headers(heads_b)
         self.assertEqual(heads_a, heads_b)
 
     @GetMock.decorate
@@ -188,6 +190,22 @@ class DecoratorTestCase(unittest.TestCase):
         # Make sure that class's last_request is same as instances.
         self.assertIs(GetMock.last_request, mock.last_request)
 
+    @GetMock.decorate(arg_name='mock', history_size=2)
+    def test_history(self, mock):
+        GetMock.reset_history()
+        for page in range(3):
+            requests.get(GetMock.url, params={'page': page})
+        self.assertEqual(mock.call_count, 3)
+        self.assertEqual(GetMock.call_count, 3)
+        # Only last 2 requests are kept on instance.
+        self.assertEqual([r.query['page'] for r in mock.history],
+                         [['1'], ['2']])
+        self.assertIs(mock.history[-1], mock.last_request)
+        self.assertEqual(len(GetMock.history), 3)
+        GetMock.reset_history()
+        self.assertEqual(GetMock.call_count, 0)
+        self.assertIsNone(GetMock.last_request)
+
     @GetDynamicMock.decorate
     def test_dynamic_valid_call(self):
         response = requests.get(GetMock.url)
@@ -213,6 +231,358 @@ class DecoratorTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), expected_response)
 
+
+class ActivateTestCase(unittest.TestCase):
+
+    def test_reusable(self):
+        handle = GetMock.activate(status=201)
+        for i in range(3):
+            with handle as placebo:
+                response = requests.get(GetMock.url)
+                self.assertEqual(response.status_code, 201)
+        self.assertIsInstance(placebo, GetMock)
+        self.assertEqual(placebo.call_count, 3)
+
+    @unittest.skipIf(utils.is_httpretty,
+                     'httpretty cycles through responses of the same url')
+    def test_nested(self):
+        outer = GetMock.activate()
+        inner = GetMock.activate(body='inner')
+        with outer:
+            with inner:
+                self.assertEqual(requests.get(GetMock.url).text, 'inner')
+                # Same handle can be entered again while it is active.
+                with inner:
+                    self.assertEqual(requests.get(GetMock.url).text,
+                                     'inner')
+                self.assertEqual(requests.get(GetMock.url).text, 'inner')
+            self.assertEqual(requests.get(GetMock.url).json(), GetMock.item)
+
+    def test_backend_without_activation(self):
+        class DecoratorOnlyMock(GetMock):
+            backend = staticmethod(lambda placebo: lambda f: f)
+
+        with self.assertRaises(ValueError):
+            DecoratorOnlyMock.activate()
+
+
+class TemplateMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/items/{item_id}/'
+
+    def status(self, url, headers, body, item_id):
+        return 200 if item_id.isdigit() else 404
+
+    def body(self, url, headers, body, item_id):
+        return json.dumps({'id': item_id})
+
+
+class TemplateTestCase(unittest.TestCase):
+
+    @TemplateMock.decorate(arg_name='mock')
+    def test_params(self, mock):
+        response = requests.get('http://www.example.com/api/items/1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'id': '1'})
+        response = requests.get('http://www.example.com/api/items/a/')
+        self.assertEqual(response.status_code, 404)
+        response = requests.get('http://www.example.com/api/items/2/?a=b')
+        self.assertEqual(response.json(), {'id': '2'})
+        self.assertEqual(mock.call_count, 3)
+
+    @TemplateMock.decorate(body='static')
+    def test_static(self):
+        response = requests.get('http://www.example.com/api/items/1/')
+        self.assertEqual(response.text, 'static')
+
+    @TemplateMock.decorate(url='http://www.example.com/api/things/{item_id}')
+    def test_overwritten_url(self):
+        response = requests.get('http://www.example.com/api/things/3')
+        self.assertEqual(response.json(), {'id': '3'})
+
+
+class QueryMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/search?q=placebo&page=1'
+    body = 'results'
+
+
+class QueryTestCase(unittest.TestCase):
+
+    @QueryMock.decorate
+    def test_subset(self):
+        for params in [[('page', '1'), ('q', 'placebo')],
+                       [('q', 'placebo'), ('page', '1'), ('size', '10')]]:
+            response = requests.get('http://www.example.com/api/search',
+                                    params=params)
+            self.assertEqual(response.text, 'results')
+
+    @QueryMock.decorate(query_match='exact')
+    @QueryMock.decorate(url='http://www.example.com/api/search?q=placebo',
+                        body='first page', query_match='exact')
+    def test_exact(self):
+        url = 'http://www.example.com/api/search'
+        response = requests.get(url, params=[('page', '1'), ('q', 'placebo')])
+        self.assertEqual(response.text, 'results')
+        response = requests.get(url, params={'q': 'placebo'})
+        self.assertEqual(response.text, 'first page')
+
+
+class RpcMock(utils.BasePlacebo):
+    url = 'http://www.example.com/rpc'
+    method = 'POST'
+    body = 'unknown method'
+
+
+@unittest.skipIf(utils.is_httpretty,
+                 'httpretty does not support request predicates')
+class PredicateTestCase(unittest.TestCase):
+
+    @RpcMock.decorate
+    @RpcMock.decorate(match_json={'method': 'getItems'}, body='items')
+    @RpcMock.decorate(match_json={'method': 'getItem'}, body='item')
+    @RpcMock.decorate(match_json={'method': 'getItem', 'params': [1]},
+                      body='first item')
+    def test_match_json(self):
+        def call(method, params=None):
+            return requests.post(RpcMock.url, json={'jsonrpc': '2.0',
+                                                    'method': method,
+                                                    'params': params}).text
+        self.assertEqual(call('getItems'), 'items')
+        self.assertEqual(call('getItem', [1]), 'first item')
+        self.assertEqual(call('getItem', [2]), 'item')
+        self.assertEqual(call('deleteItem'), 'unknown method')
+        self.assertEqual(requests.post(RpcMock.url, data='x').text,
+                         'unknown method')
+
+    @RpcMock.decorate
+    @RpcMock.decorate(match_headers={'Authorization': 'Bearer token'},
+                      body='authorized')
+    def test_match_headers(self):
+        response = requests.post(RpcMock.url,
+                                 headers={'authorization': 'Bearer token'})
+        self.assertEqual(response.text, 'authorized')
+        response = requests.post(RpcMock.url)
+        self.assertEqual(response.text, 'unknown method')
+
+
+@unittest.skipUnless(utils.is_httpretty, 'httpretty only')
+class HttprettyPredicateTestCase(unittest.TestCase):
+
+    def test_not_supported(self):
+        with self.assertRaises(ValueError):
+            with RpcMock.activate(match_json={'method': 'getItems'}):
+                pass
+
+
+class MatcherCacheTestCase(unittest.TestCase):
+
+    def test_matcher_is_cached_on_class(self):
+        class CachedMock(GetMock):
+            pass
+
+        matcher = CachedMock()._get_matcher()
+        self.assertIs(CachedMock()._get_matcher(), matcher)
+        # Parent class has its own cache.
+        self.assertIsNot(GetMock()._get_matcher(), matcher)
+        # Overwritten url or method does not use class cache.
+        self.assertIsNot(CachedMock(method='POST')._get_matcher(), matcher)
+        self.assertEqual(CachedMock(method='POST')._get_matcher().method,
+                         'POST')
+        self.assertIs(CachedMock(status=500)._get_matcher(), matcher)
+        # Changing url on class invalidates the cache.
+        CachedMock.url = GetMock.url2
+        new_matcher = CachedMock()._get_matcher()
+        self.assertIsNot(new_matcher, matcher)
+        self.assertEqual(new_matcher.url, GetMock.url2)
+
+    def test_callable_url(self):
+        urls = [GetMock.url]
+
+        class SettingsMock(GetMock):
+            def url(self):
+                return urls[-1]
+
+        activation = SettingsMock.activate()
+        for url in (GetMock.url, GetMock.url2):
+            urls.append(url)
+            with activation:
+                self.assertEqual(requests.get(url).json(), GetMock.item)
+            # New decorators get the new value too.
+            get = SettingsMock.decorate(requests.get)
+            self.assertEqual(get(url).json(), GetMock.item)
+            self.assertEqual(SettingsMock()._get_matcher().url, url)
+
+
+class StaticResponseTestCase(unittest.TestCase):
+
+    def test_static_response(self):
+        response = GetMock()._get_static_response()
+        self.assertIsNotNone(response)
+        self.assertIs(GetMock()._get_static_response(), response)
+        self.assertEqual(response.body, GetMock.body.encode('utf-8'))
+        headers = response.get_headers()
+        self.assertEqual(headers['Content-Length'], str(len(GetMock.body)))
+        self.assertEqual(headers['custom-header'], 'OK')
+        # Overwritten values are not cached on class.
+        response2 = GetMock(status=500)._get_static_response()
+        self.assertEqual(response2.status, 500)
+        self.assertIs(GetMock()._get_static_response(), response)
+
+    def test_json_body(self):
+        response = GetMock(body=GetMock.item)._get_static_response()
+        self.assertEqual(json.loads(response.body.decode('utf-8')),
+                         GetMock.item)
+        response = GetMock(body=[1, 2])._get_static_response()
+        self.assertEqual(response.body, b'[1, 2]')
+        with self.assertRaises(ValueError):
+            GetMock(body=12)._get_static_response()
+
+    @GetMock.decorate(body=GetMock.item)
+    def test_json_body_request(self):
+        self.assertEqual(requests.get(GetMock.url).json(), GetMock.item)
+
+    def test_dynamic_response(self):
+        self.assertIsNone(GetDynamicMock()._get_static_response())
+        self.assertIsNone(
+            GetMock(body=lambda *args: '')._get_static_response())
+
+    def test_overwritten_getters(self):
+        class TeapotMock(GetMock):
+            body = 'hello'
+
+            def _get_status(self, url, headers, body, **params):
+                return 418
+
+            def _get_headers(self, url, headers, body, **params):
+                return {'X-Custom': 'yes'}
+
+        self.assertIsNone(TeapotMock()._get_static_response())
+
+        @TeapotMock.decorate
+        def get():
+            return requests.get(GetMock.url)
+        response = get()
+        self.assertEqual(response.status_code, 418)
+        self.assertEqual(response.headers['X-Custom'], 'yes')
+        self.assertEqual(response.text, 'hello')
+
+    @GetMock.decorate(arg_name='mock')
+    def test_static_response_request(self, mock):
+        response = requests.get(GetMock.url)
+        self.assertEqual(response.json(), GetMock.item)
+        self.assertEqual(response.headers['content-length'],
+                         str(len(GetMock.body)))
+        # Static responses still keep track of requests.
+        self.assertEqual(mock.last_request.url, GetMock.url)
+
+
+class RespondMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/items/{item_id}'
+    method = 'POST'
+
+    def respond(self, request):
+        item = json.loads(request.body)
+        item['id'] = int(request.params['item_id'])
+        return PlaceboResponse(201, {'X-Method': request.method},
+                               json.dumps(item))
+
+
+class RespondTestCase(unittest.TestCase):
+
+    @RespondMock.decorate(arg_name='mock')
+    def test_respond(self, mock):
+        response = requests.post('http://www.example.com/api/items/3',
+                                 json={'name': 'placebo'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.headers['X-Method'], 'POST')
+        self.assertEqual(response.json(), {'id': 3, 'name': 'placebo'})
+        # Request that is given to respond is kept in history.
+        self.assertEqual(mock.last_request.params, {'item_id': '3'})
+        self.assertEqual(mock.call_count, 1)
+
+    def test_called_once(self):
+        calls = []
+
+        def respond(request):
+            calls.append(request)
+            return 404, {}, 'not found'
+
+        @RespondMock.decorate(respond=respond, body='unused', status=200)
+        def run():
+            return requests.post('http://www.example.com/api/items/1')
+        response = run()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.text, 'not found')
+        self.assertEqual(len(calls), 1)
+
+    def test_not_static(self):
+        self.assertIsNone(RespondMock()._get_static_response())
+        self.assertIsNone(
+            GetMock(respond=lambda request: (200, {}, ''))
+            ._get_static_response())
+        self.assertIsNotNone(GetMock()._get_static_response())
+
+
+class StreamMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/download'
+    chunk = b'x' * 1024
+    chunk_count = 100
+
+    def body(self, request_url, request_headers, request_body):
+        for i in range(self.chunk_count):
+            yield self.chunk
+
+
+class StreamingTestCase(unittest.TestCase):
+
+    @StreamMock.decorate
+    def test_generator_body(self):
+        response = requests.get(StreamMock.url, stream=True)
+        self.assertEqual(response.status_code, 200)
+        size = 0
+        for chunk in response.iter_content(chunk_size=1024):
+            self.assertEqual(chunk, StreamMock.chunk)
+            size += len(chunk)
+        self.assertEqual(size, 1024 * StreamMock.chunk_count)
+
+    @StreamMock.decorate(body=lambda *args: six.BytesIO(b'file content'))
+    def test_file_body(self):
+        response = requests.get(StreamMock.url)
+        self.assertEqual(response.content, b'file content')
+
+    def test_stream_is_not_static(self):
+        generator = (chunk for chunk in [b'a', b'b'])
+        self.assertIsNone(StreamMock(body=generator)._get_static_response())
+
+
+class FileMock(utils.BasePlacebo):
+    item = {'name': 'Huseyin', 'last_name': 'Yilmaz'}
+    url = 'http://www.example.com/api/item'
+    body_file = os.path.join(os.path.dirname(__file__),
+                             'fixtures', 'item.json')
+
+
+class FileBodyTestCase(unittest.TestCase):
+
+    @FileMock.decorate
+    def test_body_file(self):
+        response = requests.get(FileMock.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), FileMock.item)
+        self.assertEqual(response.headers['content-length'],
+                         str(os.path.getsize(FileMock.body_file)))
+
+    @FileMock.decorate(body=FileBody(FileMock.body_file), status=404)
+    def test_file_body(self):
+        response = requests.get(FileMock.url)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), FileMock.item)
+
+    def test_file_body_is_shared(self):
+        body = FileBody.open(FileMock.body_file)
+        self.assertIs(FileBody.open(FileMock.body_file), body)
+        self.assertEqual(json.loads(body.buffer.tobytes().decode('utf-8')),
+                         FileMock.item)
+
 ###################################
 # Regex tests for httmock backend #
 ###################################
@@ -261,6 +631,23 @@ class HttmockTestCase(unittest.TestCase):
         response = requests.get('https://www.example.com/items/2/')
         self.assertEqual(response.json(), HttmockRegexMock.item)
 
+    @GetMock.decorate
+    @GetMock.decorate(url=GetMock.url2)
+    @HttmockRegexMock.decorate
+    def test_single_dispatcher(self):
+        from placebo.backends import httmockbackend
+        dispatcher = httmockbackend.get_dispatcher()
+        # All stacked decorators share one dispatcher.
+        self.assertEqual(len(dispatcher.routes), 3)
+        response = requests.get(GetMock.url2)
+        self.assertEqual(response.json(), GetMock.item)
+
+    @GetMock.decorate(url='http://www.acme.com/items/')
+    def test_url_prefix(self):
+        # Like httmock.urlmatch, url path is matched as a prefix.
+        response = requests.get('http://www.acme.com/items/1/')
+        self.assertEqual(response.json(), GetMock.item)
+
 ###############################
 # Regex for httpretty backend #
 ###############################
@@ -274,7 +661,7 @@ class HttprettyCatchAllMock(utils.BasePlacebo):
 
 class HttprettyRegexMock(utils.BasePlacebo):
     item = {'name': 'Huseyin', 'last_name': 'Yilmaz'}
-    url = (re.compile('^http(s)?://www.example.com/items/\d+/$')
+    url = (re.compile(r'^http(s)?://www.example.com/items/\d+/$')
            if utils.is_httpretty else '')
     body = json.dumps(item)
 
@@ -309,3 +696,38 @@ class HttprettyRegexTestCase(unittest.TestCase):
         response = requests.get(
             'https://www.example.com/items/2/?name=abc&second=&third=2')
         self.assertEqual(response.json(), HttprettyRegexMock.item)
+
+
+@unittest.skipUnless(utils.is_httpretty,
+                     "Httpretty specific session tests")
+class HttprettySessionTestCase(unittest.TestCase):
+    """httpretty is enabled once for all tests of this class."""
+
+    @classmethod
+    def setUpClass(cls):
+        from placebo.backends import httprettybackend
+        httprettybackend.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        from placebo.backends import httprettybackend
+        httprettybackend.disable()
+
+    def test_registrations_are_removed(self):
+        import httpretty
+
+        @GetMock.decorate
+        @GetMock.decorate(url=GetMock.url2, body=json.dumps(GetMock.item2))
+        def run():
+            self.assertEqual(len(httpretty.httpretty._entries), 2)
+            self.assertEqual(requests.get(GetMock.url2).json(),
+                             GetMock.item2)
+        run()
+        # httpretty stays enabled, only urls are unregistered.
+        self.assertTrue(httpretty.is_enabled())
+        self.assertEqual(httpretty.httpretty._entries, {})
+
+    @GetMock.decorate(body=json.dumps(GetMock.item2))
+    def test_same_url(self):
+        # Registrations of previous tests do not leak.
+        self.assertEqual(requests.get(GetMock.url).json(), GetMock.item2)
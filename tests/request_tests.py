@@ -0,0 +1,44 @@
+"""Tests for PlaceboRequest."""
+import unittest
+
+from six.moves.urllib import parse
+
+from placebo.request import PlaceboRequest
+
+
+class PlaceboRequestTestCase(unittest.TestCase):
+
+    url = 'http://www.example.com/api/item?name=abc&page=2&empty='
+
+    def test_string_url(self):
+        request = PlaceboRequest(self.url, {'a': 'b'}, 'body')
+        self.assertEqual(request.url, self.url)
+        self.assertEqual(request.parsed_url, parse.urlparse(self.url))
+        self.assertEqual(request.query, {'name': ['abc'],
+                                         'page': ['2'],
+                                         'empty': ['']})
+        # Query is parsed only once.
+        self.assertIs(request.query, request.query)
+        self.assertEqual(request.headers, {'a': 'b'})
+        self.assertEqual(request.body, 'body')
+
+    def test_parsed_url(self):
+        parsed_url = parse.urlsplit(self.url)
+        request = PlaceboRequest(parsed_url, {}, '')
+        self.assertIs(request.parsed_url, parsed_url)
+        self.assertEqual(request.url, self.url)
+
+    def test_headers_are_converted(self):
+        headers = [('custom-header', 'value')]
+        request = PlaceboRequest(self.url, headers, '')
+        self.assertEqual(request.headers, {'custom-header': 'value'})
+
+    def test_repr(self):
+        request = PlaceboRequest(self.url, {}, 'body')
+        self.assertIn('body', repr(request))
+        self.assertEqual(str(request), '<PlaceboRequest %s>' % self.url)
+
+    def test_slots(self):
+        request = PlaceboRequest(self.url, {}, 'body')
+        with self.assertRaises(AttributeError):
+            request.data = 'data'
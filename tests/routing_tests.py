@@ -0,0 +1,288 @@
+"""Tests for route table used by backends."""
+import unittest
+
+from six.moves.urllib import parse
+
+from placebo.routing import Matcher
+from placebo.routing import RouteTable
+
+
+class RouteTableTestCase(unittest.TestCase):
+
+    def match(self, table, url, method='GET'):
+        route = table.match(method, parse.urlsplit(url))
+        return None if route is None else route.placebo
+
+    def test_exact_match(self):
+        table = RouteTable()
+        matcher = Matcher('http://www.example.com/api/item', 'get')
+        self.assertIsNotNone(matcher.key)
+        table.add(matcher, 'item')
+        self.assertEqual(self.match(table, 'http://www.example.com/api/item'),
+                         'item')
+        self.assertIsNone(self.match(table, 'http://www.example.com/api/item',
+                                     method='POST'))
+        self.assertIsNone(
+            self.match(table, 'https://www.example.com/api/item'))
+        self.assertIsNone(self.match(table, 'http://www.example.com/api/'))
+
+    def test_prefix_match(self):
+        # Paths of exact urls match like httmock.urlmatch (re.match).
+        table = RouteTable()
+        table.add(Matcher('http://www.example.com/items/', 'GET'), 'items')
+        table.add(Matcher('http://www.example.com/items/1/tags', 'GET'),
+                  'tags')
+        self.assertEqual(self.match(table, 'http://www.example.com/items/'),
+                         'items')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items/1/'), 'items')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items/1/tags/a'),
+            'tags')
+        self.assertIsNone(self.match(table, 'http://www.example.com/item'))
+        self.assertIsNone(self.match(table, 'http://www.example.org/items/'))
+        # Inner placebo of a shorter path wins over an outer one.
+        table.add(Matcher('http://www.example.com/items/', 'GET'), 'inner')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items/1/tags'),
+            'inner')
+
+    def test_regex_match(self):
+        table = RouteTable()
+        matcher = Matcher(parse.ParseResult(scheme='',
+                                            netloc=r'.*',
+                                            path=r'^/items/(\d+)/$',
+                                            params='',
+                                            query='',
+                                            fragment=''),
+                          'GET')
+        self.assertIsNone(matcher.key)
+        table.add(matcher, 'items')
+        self.assertEqual(self.match(table, 'https://a.com/items/1/'), 'items')
+        self.assertIsNone(self.match(table, 'https://a.com/items/a/'))
+
+    def test_priority(self):
+        table = RouteTable()
+        catch_all = Matcher(parse.ParseResult(scheme='', netloc=r'.*',
+                                              path='', params='',
+                                              query='', fragment=''),
+                            'GET')
+        exact = Matcher('http://www.example.com/api/item', 'GET')
+        table.add(exact, 'exact')
+        route = table.add(catch_all, 'all')
+        # Last added route wins.
+        self.assertEqual(self.match(table, 'http://www.example.com/api/item'),
+                         'all')
+        table.remove(route)
+        self.assertEqual(self.match(table, 'http://www.example.com/api/item'),
+                         'exact')
+        table.add(catch_all, 'all')
+        table.add(exact, 'exact2')
+        self.assertEqual(self.match(table, 'http://www.example.com/api/item'),
+                         'exact2')
+        self.assertEqual(self.match(table, 'http://www.example.com/other'),
+                         'all')
+        self.assertEqual(len(table), 3)
+
+    def test_template_match(self):
+        table = RouteTable()
+        matcher = Matcher('http://www.example.com/items/{id}/', 'GET')
+        self.assertIsNone(matcher.key)
+        self.assertEqual(matcher.template.names, ['id'])
+        table.add(matcher, 'item')
+        table.add(Matcher('http://www.example.com/items/{id}.{format}',
+                          'GET'), 'format')
+        table.add(Matcher('http://www.example.com/items/{id}/tags/{tag}',
+                          'GET'), 'tag')
+        self.assertEqual(self.match(table, 'http://www.example.com/items/1/'),
+                         'item')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items/1.json'),
+            'format')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items/1/tags/a'),
+            'tag')
+        # Parameters do not match empty or multiple segments.
+        self.assertIsNone(self.match(table, 'http://www.example.com/items//'))
+        self.assertIsNone(
+            self.match(table, 'http://www.example.com/items/1/2/'))
+        self.assertIsNone(self.match(table, 'http://www.example.com/items/1/',
+                                     method='POST'))
+        self.assertIsNone(self.match(table, 'http://other.com/items/1/'))
+        self.assertEqual(
+            matcher.template.get_params('/items/a%20b/'), {'id': 'a%20b'})
+
+    def test_template_priority(self):
+        table = RouteTable()
+        template = Matcher('http://www.example.com/items/{id}/', 'GET')
+        exact = Matcher('http://www.example.com/items/1/', 'GET')
+        route = table.add(exact, 'exact')
+        table.add(template, 'template')
+        # Last added route wins.
+        self.assertEqual(self.match(table, 'http://www.example.com/items/1/'),
+                         'template')
+        table.remove(route)
+        table.add(exact, 'exact')
+        self.assertEqual(self.match(table, 'http://www.example.com/items/1/'),
+                         'exact')
+        self.assertEqual(self.match(table, 'http://www.example.com/items/2/'),
+                         'template')
+        # Copies build their own router.
+        copy = table.copy()
+        copy.remove(copy.find('template'))
+        self.assertIsNone(self.match(copy, 'http://www.example.com/items/2/'))
+        self.assertEqual(self.match(table, 'http://www.example.com/items/2/'),
+                         'template')
+
+    def test_template_is_not_regex(self):
+        self.assertIsNotNone(
+            Matcher('http://www.example.com/items/{id}', 'GET').template)
+        for url in ['http://www.example.com/items/\\d{3}',
+                    'http://www.example.com/items/{1}',
+                    'http://www.example.com/items/{id}/(a|b)']:
+            matcher = Matcher(url, 'GET')
+            self.assertIsNone(matcher.template)
+            self.assertIsNone(matcher.key)
+        with self.assertRaises(ValueError):
+            Matcher('http://www.example.com/{id}/{id}', 'GET')
+
+    def test_query_match(self):
+        table = RouteTable()
+        table.add(Matcher('http://www.example.com/items?a=1&b=x+y', 'GET'),
+                  'subset')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items?b=x%20y&a=1'),
+            'subset')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items?c=3&a=1&b=x+y'),
+            'subset')
+        self.assertIsNone(
+            self.match(table, 'http://www.example.com/items?a=1'))
+        self.assertIsNone(
+            self.match(table, 'http://www.example.com/items?a=10&b=x+y'))
+        self.assertIsNone(self.match(table, 'http://www.example.com/items'))
+
+    def test_query_exact(self):
+        table = RouteTable()
+        table.add(Matcher('http://www.example.com/items?a=1&a=2', 'GET',
+                          query_match='exact'), 'exact')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items?a=2&a=1'),
+            'exact')
+        self.assertIsNone(
+            self.match(table, 'http://www.example.com/items?a=2&a=1&b=3'))
+        self.assertIsNone(
+            self.match(table, 'http://www.example.com/items?a=1'))
+        table.add(Matcher('http://www.example.com/items', 'GET',
+                          query_match='exact'), 'empty')
+        self.assertEqual(self.match(table, 'http://www.example.com/items'),
+                         'empty')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items?a=1&a=2'),
+            'exact')
+        with self.assertRaises(ValueError):
+            Matcher('http://www.example.com/items', 'GET', query_match='a')
+
+    def test_query_regex(self):
+        table = RouteTable()
+        matcher = Matcher('http://www.example.com/items?page=\\d+$', 'GET')
+        self.assertIsNotNone(matcher.query_re)
+        table.add(matcher, 'regex')
+        self.assertEqual(
+            self.match(table, 'http://www.example.com/items?page=12'),
+            'regex')
+        self.assertIsNone(
+            self.match(table, 'http://www.example.com/items?page=a'))
+
+    def test_query_url_string(self):
+        matcher = Matcher('http://www.example.com/items?b=2&a=x+y', 'GET')
+        regex = matcher.get_url_string()
+        # httpretty matches with its normalized query string.
+        self.assertTrue(
+            regex.search('http://www.example.com/items?a=x+y&b=2&c=3'))
+        self.assertFalse(regex.search('http://www.example.com/items?a=x'))
+        matcher = Matcher('http://www.example.com/items?b=2&a=1', 'GET',
+                          query_match='exact')
+        regex = matcher.get_url_string()
+        self.assertTrue(regex.search('http://www.example.com/items?a=1&b=2'))
+        self.assertFalse(
+            regex.search('http://www.example.com/items?a=1&b=2&c=3'))
+        self.assertEqual(
+            Matcher('http://www.example.com/items', 'GET').get_url_string(),
+            'http://www.example.com/items')
+
+    def test_json_predicates(self):
+        table = RouteTable()
+        url = 'http://www.example.com/rpc'
+        table.add(Matcher(url, 'POST'), 'fallback')
+        for method in ['getItems', 'getItem', 'deleteItem']:
+            table.add(Matcher(url, 'POST', match_json={'method': method}),
+                      method)
+        table.add(Matcher(url, 'POST', match_json={'method': 'getItem',
+                                                   'params': {'id': 1}}),
+                  'first item')
+
+        def match(body):
+            route = table.match('POST', parse.urlsplit(url), body=body)
+            return route.placebo
+        self.assertEqual(match(b'{"method": "getItems"}'), 'getItems')
+        self.assertEqual(match(b'{"method": "getItem", "params": {"id": 2}}'),
+                         'getItem')
+        self.assertEqual(
+            match(b'{"method": "getItem", "params": {"id": 1, "a": 1}}'),
+            'first item')
+        self.assertEqual(match(b'{"method": "unknown"}'), 'fallback')
+        self.assertEqual(match(b'{"method": ["getItems"]}'), 'fallback')
+        self.assertEqual(match(b'not json'), 'fallback')
+        self.assertEqual(match(None), 'fallback')
+        index = table._indexes[('POST', 'http', 'www.example.com', '/rpc')]
+        self.assertEqual(index.field, 'method')
+
+    def test_json_predicates_with_objects(self):
+        table = RouteTable()
+        url = 'http://www.example.com/rpc'
+        table.add(Matcher(url, 'POST', match_json={'method': 'a'}), 'a')
+        table.add(Matcher(url, 'POST', match_json={'method': 'b'}), 'b')
+        table.add(Matcher(url, 'POST',
+                          match_json={'method': {'name': 'c'}}), 'c')
+
+        def match(body):
+            route = table.match('POST', parse.urlsplit(url), body=body)
+            return None if route is None else route.placebo
+        self.assertEqual(match(b'{"method": "a"}'), 'a')
+        self.assertEqual(match(b'{"method": {"name": "c", "v": 1}}'), 'c')
+        self.assertIsNone(match(b'{"method": "c"}'))
+
+    def test_json_is_decoded_once(self):
+        class Body(bytes):
+            decoded = 0
+
+            def decode(self, *args):
+                Body.decoded += 1
+                return bytes.decode(self, *args)
+
+        table = RouteTable()
+        url = 'http://www.example.com/graphql'
+        for name in ['a', 'b', 'c']:
+            table.add(Matcher(url, 'POST',
+                              match_json={'operationName': name,
+                                          'variables': {'id': 1}}),
+                      name)
+        table.add(Matcher(url, 'POST', match_json={'variables': {'id': 2}}),
+                  'd')
+        body = Body(b'{"operationName": "a", "variables": {"id": 2}}')
+        route = table.match('POST', parse.urlsplit(url), body=body)
+        self.assertEqual(route.placebo, 'd')
+        self.assertEqual(Body.decoded, 1)
+
+    def test_header_predicates(self):
+        table = RouteTable()
+        url = 'http://www.example.com/api/items'
+        table.add(Matcher(url, 'GET'), 'any')
+        table.add(Matcher(url, 'GET', match_headers={'X-Version': '2'}), 'v2')
+        url = parse.urlsplit(url)
+        self.assertEqual(
+            table.match('GET', url, {'x-version': '2'}).placebo, 'v2')
+        self.assertEqual(
+            table.match('GET', url, {'X-Version': '1'}).placebo, 'any')
+        self.assertEqual(table.match('GET', url).placebo, 'any')
@@ -0,0 +1,147 @@
+"""Tests for response sequences."""
+import threading
+import unittest
+
+import requests
+
+from placebo import PlaceboResponse
+from placebo import sequence
+from placebo.sequence import ResponseSequence
+from placebo.sequence import ResponsesExhausted
+from tests import utils
+
+
+class ResponseSequenceTestCase(unittest.TestCase):
+
+    def take(self, responses, policy, count):
+        cursor = ResponseSequence(responses, policy)
+        return [cursor.next() for i in range(count)]
+
+    def test_policies(self):
+        self.assertEqual(self.take([1, 2, 3], sequence.REPEAT_LAST, 5),
+                         [1, 2, 3, 3, 3])
+        self.assertEqual(self.take([1, 2, 3], sequence.CYCLE, 5),
+                         [1, 2, 3, 1, 2])
+        self.assertEqual(self.take([1, 2, 3], sequence.EXHAUST, 3),
+                         [1, 2, 3])
+        with self.assertRaises(ResponsesExhausted):
+            self.take([1, 2, 3], sequence.EXHAUST, 4)
+        with self.assertRaises(ResponsesExhausted):
+            self.take([], sequence.REPEAT_LAST, 1)
+        with self.assertRaises(ValueError):
+            ResponseSequence([1], 'random')
+
+    def test_iterators(self):
+        self.assertEqual(
+            self.take(iter([1, 2, 3]), sequence.REPEAT_LAST, 5),
+            [1, 2, 3, 3, 3])
+        self.assertEqual(self.take(iter([1, 2, 3]), sequence.CYCLE, 7),
+                         [1, 2, 3, 1, 2, 3, 1])
+        with self.assertRaises(ResponsesExhausted):
+            self.take(iter([1, 2]), sequence.EXHAUST, 3)
+
+    def test_infinite_iterator(self):
+        def pages():
+            page = 0
+            while True:
+                yield page
+                page += 1
+        cursor = ResponseSequence(pages(), sequence.REPEAT_LAST)
+        for i in range(1000):
+            self.assertEqual(cursor.next(), i)
+        # Only last item is kept.
+        self.assertEqual(cursor._items, [999])
+
+    def test_threads(self):
+        cursor = ResponseSequence(list(range(4000)), sequence.EXHAUST)
+        taken = []
+
+        def take():
+            taken.extend(cursor.next() for i in range(1000))
+        threads = [threading.Thread(target=take) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(taken), list(range(4000)))
+
+
+class FlakyMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/items'
+    responses = [(503, {}, 'unavailable'),
+                 (503, {'Retry-After': '1'}, 'unavailable'),
+                 PlaceboResponse(200, {}, 'items')]
+
+
+class PagesMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/pages'
+    responses_policy = sequence.EXHAUST
+
+    def responses(self):
+        for page in range(3):
+            yield 200, {}, 'page %d' % page
+
+        def last(request):
+            return 200, {}, 'last page of %s' % request.url
+        yield last
+
+
+class SequenceTestCase(unittest.TestCase):
+
+    def get_statuses(self, count):
+        return [requests.get(FlakyMock.url).status_code
+                for i in range(count)]
+
+    @FlakyMock.decorate(arg_name='mock')
+    def test_retry(self, mock):
+        self.assertEqual(self.get_statuses(4), [503, 503, 200, 200])
+        self.assertEqual(mock.call_count, 4)
+
+    def test_activations_have_own_cursor(self):
+        run = FlakyMock.decorate(self.get_statuses)
+        self.assertEqual(run(2), [503, 503])
+        self.assertEqual(run(2), [503, 503])
+
+    @FlakyMock.decorate(responses_policy='cycle')
+    def test_cycle(self):
+        self.assertEqual(self.get_statuses(4), [503, 503, 200, 503])
+
+    @PagesMock.decorate
+    def test_generator(self):
+        for page in range(3):
+            self.assertEqual(requests.get(PagesMock.url).text,
+                             'page %d' % page)
+        self.assertEqual(requests.get(PagesMock.url).text,
+                         'last page of %s' % PagesMock.url)
+
+    @unittest.skipIf(utils.is_httpretty,
+                     'httpretty does not raise errors of its callbacks')
+    @PagesMock.decorate
+    def test_exhausted(self):
+        for page in range(4):
+            requests.get(PagesMock.url)
+        with self.assertRaises(ResponsesExhausted):
+            requests.get(PagesMock.url)
+
+    def test_not_static(self):
+        self.assertIsNone(FlakyMock()._get_static_response())
+
+    def test_iterator_is_not_reused(self):
+        with self.assertRaises(ValueError):
+            FlakyMock.decorate(responses=iter([(200, {}, 'once')]))(
+                self.get_statuses)(1)
+        # Re-iterables and callables make a new iterator every time.
+        self.assertEqual(FlakyMock(responses=range(2))
+                         ._get_responses().next(), 0)
+
+
+@FlakyMock.decorate(arg_name='mock')
+class ClassSequenceTestCase(unittest.TestCase):
+    # Sequences start over for each test of a decorated class.
+
+    def test_first(self):
+        self.assertEqual(requests.get(FlakyMock.url).status_code, 503)
+
+    def test_second(self):
+        self.assertEqual(requests.get(FlakyMock.url).status_code, 503)
+        self.assertIsInstance(self.mock, FlakyMock)
@@ -0,0 +1,158 @@
+"""Tests for standalone placebo server."""
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import unittest
+
+import requests
+
+from placebo import Placebo
+from placebo import cli
+from placebo import server
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class ItemsMock(Placebo):
+    item = [{'id': 1}]
+    url = 'http://api.example.com/items'
+    body = json.dumps(item)
+    headers = {'Content-Type': 'application/json'}
+
+
+class EchoMock(Placebo):
+    url = 'http://api.example.com/echo'
+    method = 'POST'
+
+    def body(self, url, headers, body):
+        return json.dumps({'query': url.query,
+                           'body': body.decode('utf-8')})
+
+
+class StreamMock(Placebo):
+    url = 'http://api.example.com/stream'
+
+    def body(self, url, headers, body):
+        return (b'x' * 10 for i in range(3))
+
+
+class FileMock(Placebo):
+    url = 'http://api.example.com/file'
+    body_file = os.path.join(FIXTURES, 'item.json')
+
+
+class BrokenMock(Placebo):
+    url = 'http://api.example.com/broken'
+
+    def body(self, url, headers, body):
+        raise ValueError('broken')
+
+
+class ServerTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = server.Server.from_module(sys.modules[__name__])
+        cls.loop = asyncio.new_event_loop()
+        cls.listener = cls.loop.run_until_complete(
+            cls.server.start('127.0.0.1', 0))
+        port = cls.listener.sockets[0].getsockname()[1]
+        cls.url = 'http://127.0.0.1:%s' % port
+        cls.thread = threading.Thread(target=cls.loop.run_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.listener.close()
+        cls.loop.run_until_complete(cls.listener.wait_closed())
+        cls.loop.close()
+
+    def test_placebo_classes(self):
+        self.assertEqual(len(self.server.routes), 5)
+
+    def test_static(self):
+        session = requests.Session()
+        for i in range(3):
+            # Same connection is reused.
+            response = session.get(self.url + '/items')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), ItemsMock.item)
+            self.assertEqual(response.headers['Content-Type'],
+                             'application/json')
+
+    def test_dynamic(self):
+        response = requests.post(self.url + '/echo?page=2', data='data')
+        self.assertEqual(response.json(), {'query': 'page=2',
+                                           'body': 'data'})
+
+    def test_stream(self):
+        response = requests.get(self.url + '/stream')
+        self.assertEqual(response.headers['Transfer-Encoding'], 'chunked')
+        self.assertEqual(response.content, b'x' * 30)
+
+    def test_file(self):
+        response = requests.get(self.url + '/file')
+        with open(FileMock.body_file, 'rb') as f:
+            self.assertEqual(response.content, f.read())
+
+    def test_errors(self):
+        self.assertEqual(requests.get(self.url + '/unknown').status_code,
+                         404)
+        self.assertEqual(requests.post(self.url + '/items').status_code,
+                         404)
+        self.assertEqual(requests.get(self.url + '/broken').status_code,
+                         500)
+
+    def test_head(self):
+        session = requests.Session()
+        response = session.head(self.url + '/items')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Length'],
+                         str(len(ItemsMock.body)))
+        # Connection is not left with a body that was not read.
+        self.assertEqual(session.get(self.url + '/items').json(),
+                         ItemsMock.item)
+
+    def test_invalid_content_length(self):
+        port = int(self.url.rsplit(':', 1)[1])
+        with socket.create_connection(('127.0.0.1', port)) as sock:
+            sock.sendall(b'POST /echo HTTP/1.1\r\nHost: x\r\n'
+                         b'Content-Length: abc\r\n\r\n')
+            self.assertTrue(sock.recv(1024).startswith(b'HTTP/1.1 400'))
+
+    def test_host_header(self):
+        class OtherItemsMock(ItemsMock):
+            url = 'http://other.example.com/items'
+            body = 'other'
+        srv = server.Server([ItemsMock(), OtherItemsMock()])
+        route, url = srv.match('GET', '/items', 'other.example.com')
+        self.assertIsInstance(route.placebo, OtherItemsMock)
+        self.assertEqual(url.netloc, 'other.example.com')
+        route, url = srv.match('GET', '/items', 'API.example.com')
+        self.assertIsInstance(route.placebo, ItemsMock)
+        # Unknown hosts are matched with all origins.
+        route, url = srv.match('GET', '/items', '127.0.0.1:8000')
+        self.assertIsInstance(route.placebo, ItemsMock)
+
+
+class CommandLineTestCase(unittest.TestCase):
+
+    def test_serve_arguments(self):
+        args = cli.get_parser().parse_args(
+            ['serve', 'tests.server_tests', '--port', '9000',
+             '--workers', '4'])
+        self.assertEqual(args.module, 'tests.server_tests')
+        self.assertEqual(args.host, '127.0.0.1')
+        self.assertEqual(args.port, 9000)
+        self.assertEqual(args.workers, 4)
+
+    def test_load_module(self):
+        module = server.load_module('tests.server_tests')
+        self.assertEqual(server.get_placebo_classes(module),
+                         [ItemsMock, EchoMock, StreamMock, FileMock,
+                          BrokenMock])
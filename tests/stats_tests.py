@@ -0,0 +1,107 @@
+"""Tests for instrumentation of placebo objects."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+import placebo
+from placebo import stats
+from tests import utils
+
+
+class StaticMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/static'
+    body = 'static'
+
+
+class DynamicMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/dynamic'
+    latency = 0
+
+    def body(self, url, headers, body):
+        return 'dynamic'
+
+
+class StreamMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/stream'
+
+    def body(self, url, headers, body):
+        return (b'x' * 10 for i in range(3))
+
+
+class StatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        stats.enable()
+
+    def tearDown(self):
+        stats.disable()
+
+    def test_disabled(self):
+        stats.disable()
+        StaticMock.decorate(lambda: requests.get(StaticMock.url))()
+        self.assertIsNone(stats.get_stats(StaticMock))
+        self.assertEqual(stats.get_report()['placebos'], {})
+
+    @StaticMock.decorate
+    def test_static(self):
+        requests.get(StaticMock.url)
+        requests.get(StaticMock.url)
+        result = stats.get_stats(StaticMock)
+        self.assertEqual(result.hits, 2)
+        self.assertEqual(result.bytes, 12)
+        self.assertEqual(result.calls, {})
+        if not utils.is_httpretty:
+            # httpretty matches requests by itself.
+            self.assertEqual(result.match.count, 2)
+
+    @DynamicMock.decorate
+    def test_dynamic(self):
+        requests.get(DynamicMock.url)
+        result = stats.get_stats(DynamicMock)
+        self.assertEqual(result.hits, 1)
+        self.assertEqual(result.bytes, 7)
+        self.assertEqual(sorted(result.calls),
+                         ['bandwidth', 'body', 'headers', 'latency',
+                          'status'])
+        self.assertEqual(result.calls['body'].count, 1)
+        self.assertGreater(result.calls['body'].total, 0)
+
+    @StreamMock.decorate
+    def test_stream(self):
+        self.assertEqual(requests.get(StreamMock.url).content, b'x' * 30)
+        self.assertEqual(stats.get_stats(StreamMock).bytes, 30)
+
+    def test_report(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        path = os.path.join(path, 'stats.json')
+        placebo.configure(stats=path)
+        StaticMock.decorate(lambda: requests.get(StaticMock.url))()
+        stats._dump_at_exit()
+        placebo.configure(stats=None)
+        self.assertIsNone(stats.collector)
+        with open(path) as f:
+            report = json.load(f)
+        result = report['placebos']['tests.stats_tests.StaticMock']
+        self.assertEqual(result['hits'], 1)
+        self.assertEqual(set(result['match']),
+                         set(['count', 'total', 'mean', 'p50', 'p90',
+                              'p99', 'max']))
+
+
+class TimeStatTestCase(unittest.TestCase):
+
+    def test_percentiles(self):
+        stat = stats.TimeStat(sample_size=100)
+        for i in range(200):
+            stat.add(i)
+        self.assertEqual(stat.count, 200)
+        self.assertEqual(stat.total, sum(range(200)))
+        # Only latest samples are kept.
+        self.assertEqual(stat.percentile(0), 100)
+        self.assertEqual(stat.percentile(50), 150)
+        self.assertEqual(stat.percentile(100), 199)
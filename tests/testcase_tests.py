@@ -0,0 +1,144 @@
+"""Tests for decorating test cases and modules."""
+import unittest
+
+import requests
+
+from placebo.utils import testcaseutils
+from tests import utils
+
+AsyncTestCase = getattr(unittest, 'IsolatedAsyncioTestCase', None)
+
+
+class ItemMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/item'
+    body = 'item'
+
+
+class ModuleMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/module'
+    body = 'module'
+
+
+events = []
+
+
+def setUpModule():
+    events.append('setUpModule')
+
+
+def tearDownModule():
+    events.append('tearDownModule')
+
+
+@ItemMock.decorate(arg_name='mock')
+class ClassDecoratorTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Placebo is active in setUpClass.
+        cls.setup_body = requests.get(ItemMock.url).text
+
+    def test_setup(self):
+        self.assertEqual(self.setup_body, 'item')
+
+    def test_request(self):
+        self.assertEqual(requests.get(ItemMock.url).text, 'item')
+        self.assertIsInstance(self.mock, ItemMock)
+        self.assertEqual(self.mock.last_request.url, ItemMock.url)
+
+    @ItemMock.decorate(body='method')
+    def test_method_decorator(self):
+        # Innermost decorator wins.
+        self.assertEqual(requests.get(ItemMock.url).text, 'method')
+
+
+class ClassDecoratorSubclassTestCase(ClassDecoratorTestCase):
+    pass
+
+
+class RunTestCaseTestCase(unittest.TestCase):
+
+    def run_test_case(self, test_case):
+        # A suite would run fixtures of this module again.
+        result = unittest.TestResult()
+        test_case.setUpClass()
+        for name in unittest.TestLoader().getTestCaseNames(test_case):
+            test_case(name).run(result)
+        test_case.tearDownClass()
+        return result
+
+    def test_deactivated(self):
+        @ItemMock.decorate(body='run')
+        class Tests(unittest.TestCase):
+            bodies = []
+
+            def test_a(self):
+                self.bodies.append(requests.get(ItemMock.url).text)
+
+            def test_b(self):
+                self.bodies.append(self.id())
+
+            @classmethod
+            def tearDownClass(cls):
+                cls.bodies.append('tearDownClass')
+
+        result = self.run_test_case(Tests)
+        self.assertTrue(result.wasSuccessful(), result.errors)
+        self.assertEqual(Tests.bodies[0], 'run')
+        self.assertEqual(len(Tests.bodies), 3)
+        self.assertEqual(Tests.bodies[-1], 'tearDownClass')
+        # Module level placebo is still active, class one is not.
+        self.assertEqual(requests.get(ItemMock.url).text, 'item')
+
+    def test_failing_setup(self):
+        @ItemMock.decorate(body='run')
+        class Tests(unittest.TestCase):
+            @classmethod
+            def setUpClass(cls):
+                raise ValueError()
+
+            def test_a(self):
+                pass
+
+        with self.assertRaises(ValueError):
+            self.run_test_case(Tests)
+        self.assertEqual(requests.get(ItemMock.url).text, 'item')
+
+    def test_not_test_case(self):
+        with self.assertRaises(ValueError):
+            ItemMock.decorate(object)
+
+    @unittest.skipIf(AsyncTestCase is None, 'Needs python 3.8')
+    def test_async_test_case(self):
+        @ItemMock.decorate(body='async')
+        class Tests(AsyncTestCase):
+            def test_a(self):
+                pass
+        # Async test cases are decorated method by method.
+        self.assertNotIn('setUpClass', Tests.__dict__)
+        self.assertTrue(hasattr(Tests.test_a, '__wrapped__'))
+
+    def test_backend_without_activation(self):
+        class Tests(unittest.TestCase):
+            def test_a(self):
+                pass
+        decorated = []
+
+        def decorator(f):
+            decorated.append(f.__name__)
+            return f
+        testcaseutils.decorate_test_case(Tests, decorator)
+        self.assertEqual(decorated, ['test_a'])
+
+
+class ModuleDecoratorTestCase(unittest.TestCase):
+
+    def test_module(self):
+        self.assertEqual(requests.get(ModuleMock.url).text, 'module')
+        self.assertEqual(events, ['setUpModule'])
+        self.assertEqual(module_mock.call_count, 1)
+
+
+# Placebo of module is also active while ItemMock is mocked by classes.
+module_mock = ModuleMock.decorate_module(__name__)
+ItemMock.decorate_module(__name__)
@@ -0,0 +1,167 @@
+"""Tests for simulated latency and bandwidth."""
+import time
+import unittest
+
+import requests
+
+from placebo import timing
+from placebo.timing import VirtualClock
+from tests import utils
+
+try:
+    from placebo.backends import asyncbackend
+except (ImportError, SyntaxError):
+    asyncbackend = None
+
+AsyncTestCase = getattr(unittest, 'IsolatedAsyncioTestCase',
+                        unittest.TestCase)
+
+
+class SlowMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/slow'
+    body = 'x' * 1000
+    latency = 0.5
+
+
+class StreamMock(utils.BasePlacebo):
+    url = 'http://www.example.com/api/stream'
+    bandwidth = 100
+
+    def body(self, url, headers, body):
+        return (b'x' * 100 for i in range(5))
+
+
+class TimingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        timing.set_clock(self.clock)
+
+    def tearDown(self):
+        timing.set_clock(None)
+
+    @SlowMock.decorate
+    def test_latency(self):
+        start = time.time()
+        requests.get(SlowMock.url)
+        requests.get(SlowMock.url)
+        self.assertEqual(self.clock.time(), 1.0)
+        # Virtual clock does not sleep.
+        self.assertLess(time.time() - start, 0.5)
+
+    @SlowMock.decorate(bandwidth=1000)
+    def test_bandwidth(self):
+        requests.get(SlowMock.url)
+        self.assertEqual(self.clock.time(), 1.5)
+
+    @SlowMock.decorate(
+        latency=lambda url, headers, body: float(url.query.split('=')[1]))
+    def test_callable(self):
+        requests.get(SlowMock.url, params={'latency': 2})
+        self.assertEqual(self.clock.time(), 2)
+
+    @SlowMock.decorate(latency=timing.Uniform(1, 2, seed=1))
+    def test_distribution(self):
+        requests.get(SlowMock.url)
+        self.assertEqual(self.clock.time(),
+                         timing.Uniform(1, 2, seed=1).sample())
+
+    @StreamMock.decorate
+    def test_stream(self):
+        response = requests.get(StreamMock.url, stream=True)
+        chunks = response.iter_content(100)
+        next(chunks)
+        if not utils.is_httpretty:
+            # Streams are throttled while they are read.
+            self.assertEqual(self.clock.time(), 1)
+        self.assertEqual(len(b''.join(chunks)), 400)
+        self.assertEqual(self.clock.time(), 5)
+
+    @unittest.skipIf(utils.is_httpretty,
+                     'httpretty responds from its own threads')
+    def test_context_clock(self):
+        @SlowMock.decorate
+        def run():
+            with VirtualClock(10) as clock:
+                requests.get(SlowMock.url)
+            self.assertEqual(clock.time(), 10.5)
+        run()
+        self.assertEqual(self.clock.time(), 0)
+
+
+class DistributionTestCase(unittest.TestCase):
+
+    def test_seed(self):
+        for distribution in [timing.Uniform(1, 2, seed=5),
+                             timing.Exponential(1, seed=5),
+                             timing.LogNormal(0.1, 0.5, seed=5)]:
+            values = [distribution.sample() for i in range(3)]
+            distribution.random.seed(5)
+            self.assertEqual([distribution.sample() for i in range(3)],
+                             values)
+
+    def test_percentiles(self):
+        distribution = timing.Percentiles({50: 0.1, 99: 1, 100: 5}, seed=1)
+        values = sorted(distribution.sample() for i in range(1000))
+        self.assertEqual(values[0], 0.1)
+        self.assertLess(values[499], 0.2)
+        self.assertGreater(values[995], 1)
+        self.assertLessEqual(values[-1], 5)
+
+
+class AsyncSlowMock(SlowMock):
+    backend = asyncbackend and asyncbackend.get_decorator
+
+
+@unittest.skipIf(asyncbackend is None or AsyncTestCase is unittest.TestCase,
+                 'Async backend needs python 3.8 and httpx or aiohttp')
+class AsyncTimingTestCase(AsyncTestCase):
+
+    @AsyncSlowMock.decorate
+    async def test_httpx(self):
+        import httpx
+        with VirtualClock() as clock:
+            async with httpx.AsyncClient() as client:
+                await client.get(SlowMock.url)
+        self.assertEqual(clock.time(), 0.5)
+
+    @AsyncSlowMock.decorate(bandwidth=1000)
+    async def test_aiohttp(self):
+        import aiohttp
+        with VirtualClock() as clock:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(SlowMock.url) as response:
+                    self.assertEqual(await response.text(), SlowMock.body)
+        self.assertEqual(clock.time(), 1.5)
+
+
+class ServerTimingTestCase(unittest.TestCase):
+
+    def test_real_latency(self):
+        import asyncio
+        from placebo import server
+        placebo = SlowMock(latency=0.05, bandwidth=20000)
+        srv = server.Server([placebo])
+
+        async def run():
+            listener = await srv.start('127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1',
+                                                           port)
+            start = time.time()
+            writer.write(b'GET /api/slow HTTP/1.1\r\nHost: x\r\n\r\n')
+            await reader.readuntil(b'\r\n\r\n')
+            body = await reader.readexactly(1000)
+            elapsed = time.time() - start
+            writer.close()
+            listener.close()
+            await listener.wait_closed()
+            return body, elapsed
+        loop = asyncio.new_event_loop()
+        try:
+            body, elapsed = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual(body, b'x' * 1000)
+        # 0.05 seconds latency and 0.05 seconds transfer time.
+        self.assertGreaterEqual(elapsed, 0.1)
@@ -1,4 +1,9 @@
+import json
 import os
+import threading
+
+from six.moves import BaseHTTPServer
+
 from placebo import Placebo
 from placebo.utils.importutils import import_string
 
@@ -24,3 +29,35 @@ def remove_common_headers(headers):
         if header in headers:
             del headers[header]
     return headers
+
+
+class TargetHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Request handler for local target server.
+
+    Responds with request method, path and body as json."""
+
+    def do_request(self):
+        length = int(self.headers.get('content-length') or 0)
+        body = self.rfile.read(length).decode('utf-8')
+        content = json.dumps({'method': self.command,
+                              'path': self.path,
+                              'body': body}).encode('utf-8')
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_request
+
+    def log_message(self, *args):
+        pass
+
+
+def start_target_server():
+    """Start a local http server in a thread. Returns server and its url."""
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), TargetHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, 'http://127.0.0.1:%s' % server.server_address[1]